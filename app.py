@@ -1,22 +1,33 @@
-from math import log
-from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, session, jsonify
+from flask import Flask, Request, Response, render_template, request, redirect, url_for, flash, send_from_directory, session, jsonify
 import os
 import tempfile
 from werkzeug.utils import secure_filename
-from docx import Document
 import re
 import json
-from datetime import datetime
+import contextvars
+import hashlib
+import io
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta
 from functools import wraps
-from config import Config as ConfigClass
+from config import config
+from check_pool import CheckPool, CheckTimeout, QueueFull
+from jobs import JobStore
+from result_cache import ResultCache, content_key
+from check_log import DEFAULT_LOG_PATH, CheckLog
+from profiles import DEFAULT_PROFILE, PROFILES_DIR, configured_profiles, with_rules
+from check_timing import TimingHistograms
+from issue_codes import render_issue, render_line_issues, render_result
+from logging_setup import configure_logging, request_id
+from snapshot import SNAPSHOT_DIR, install as install_snapshot
 
-# Initialize config
-config = ConfigClass()
+# Root log level plus per-module overrides, e.g. LOG_LEVELS="docx_stream=DEBUG,check_pool=WARNING"
+configure_logging(os.environ.get('LOG_LEVEL', 'INFO'), os.environ.get('LOG_LEVELS', ''))
+# Named explicitly: __name__ is '__main__' when app.py is run as a script
+log = logging.getLogger('app')
 
-from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_PARAGRAPH_ALIGNMENT, WD_LINE_SPACING
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
-from docx.shared import RGBColor, Inches, Pt
 from typing import Optional, List, Dict, Any, Tuple, Union
 
 # Add datetime filter
@@ -27,20 +38,62 @@ def datetimeformat(value, format='%Y-%m-%d %H:%M'):
         value = datetime.fromisoformat(value)
     return value.strftime(format)
 
+class UploadRequest(Request):
+    """Request whose uploads stay in memory instead of spilling to a temporary file
+
+    MAX_CONTENT_LENGTH bounds the buffer, and the checker opens the .docx
+    straight from it, so a check never touches the disk.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
 app = Flask(__name__)
+app.request_class = UploadRequest
 
-# Initialize config
-config = ConfigClass()
 app.secret_key = 'your-secret-key-here'  # Change this to a secure secret key in production
 app.jinja_env.filters['datetimeformat'] = datetimeformat
+# Templates precompiled by snapshot.py at build time, when present and current
+install_snapshot(app, os.environ.get('TEMPLATE_SNAPSHOT_DIR', SNAPSHOT_DIR))
 
 # Configure upload settings
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-# Ensure upload folder exists
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Document check execution: process pool size (0 = background thread), waiting
+# queue length and per-check CPU/wall-clock budgets in seconds
+app.config['CHECK_WORKERS'] = int(os.environ.get('CHECK_WORKERS', os.cpu_count() or 1))
+app.config['CHECK_QUEUE_SIZE'] = int(os.environ.get('CHECK_QUEUE_SIZE', 8))
+app.config['CHECK_CPU_SECONDS'] = float(os.environ.get('CHECK_CPU_SECONDS', 60))
+app.config['CHECK_TIMEOUT'] = float(os.environ.get('CHECK_TIMEOUT', 90))
+# Pre-flight limits, checked from the zip metadata before any parsing. Documents
+# whose main part exceeds SLOW_LANE_DOCUMENT_MB are checked on a separate pool
+# so they cannot hold up ordinary uploads
+app.config['PREFLIGHT_MAX_DOCUMENT_MB'] = int(os.environ.get('PREFLIGHT_MAX_DOCUMENT_MB', 64))
+app.config['PREFLIGHT_MAX_TOTAL_MB'] = int(os.environ.get('PREFLIGHT_MAX_TOTAL_MB', 512))
+app.config['PREFLIGHT_MAX_RATIO'] = int(os.environ.get('PREFLIGHT_MAX_RATIO', 100))
+app.config['SLOW_LANE_DOCUMENT_MB'] = int(os.environ.get('SLOW_LANE_DOCUMENT_MB', 8))
+app.config['SLOW_LANE_WORKERS'] = int(os.environ.get('SLOW_LANE_WORKERS', 1))
+app.config['SLOW_LANE_TIMEOUT'] = float(os.environ.get('SLOW_LANE_TIMEOUT', 300))
+# Time every check per rule for the admin dashboard; otherwise only ?debug=1 requests are timed
+app.config['CHECK_TIMINGS'] = os.environ.get('CHECK_TIMINGS', '0').lower() in ('1', 'true', 'yes')
+
+# Result cache for re-uploads of identical documents (empty dir = memory only)
+app.config['RESULT_CACHE_DIR'] = os.environ.get('RESULT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'document-checker-cache'))
+app.config['RESULT_CACHE_ENTRIES'] = int(os.environ.get('RESULT_CACHE_ENTRIES', 128))
+app.config['RESULT_CACHE_DISK_MB'] = int(os.environ.get('RESULT_CACHE_DISK_MB', 256))
+app.config['RESULT_CACHE_TTL'] = int(os.environ.get('RESULT_CACHE_TTL', 7 * 24 * 3600))
+
+# Finished results are kept server-side and shown at /results/<id>
+app.config['RESULT_STORE_DIR'] = os.environ.get('RESULT_STORE_DIR', os.path.join(tempfile.gettempdir(), 'document-checker-results'))
+app.config['RESULT_STORE_DISK_MB'] = int(os.environ.get('RESULT_STORE_DISK_MB', 512))
+app.config['RESULT_STORE_TTL'] = int(os.environ.get('RESULT_STORE_TTL', 7 * 24 * 3600))
+app.config['RESULT_LINES_PER_PAGE'] = int(os.environ.get('RESULT_LINES_PER_PAGE', 50))
+
+# Admin check history (SQLite, WAL mode); 0 days keeps it forever
+app.config['CHECK_LOG_PATH'] = os.environ.get('CHECK_LOG_PATH', DEFAULT_LOG_PATH)
+app.config['CHECK_LOG_RETENTION_DAYS'] = int(os.environ.get('CHECK_LOG_RETENTION_DAYS', 0))
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'docx'}
@@ -48,797 +101,134 @@ ALLOWED_EXTENSIONS = {'docx'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-class DocumentChecker:
-    def __init__(self, filepath):
-        # Basic file and document attributes
-        self.filepath = filepath
-        self.doc = Document(filepath)
-        
-        # Tracking and issue reporting
-        self.issues = []
-        self.line_issues = []
-        self.current_paragraph = None
-        self.current_page = 1  # Track current page number
-        self.line_page_mapping = {}  # Map line numbers to page numbers
-        
-        # Document structure tracking
-        self.current_section = None
-        self.in_abstract = False
-        self.in_references = False
-        self.after_abstract = False
-        
-        # Statistics and counters
-        self.total_lines = 0
-        self.lines_with_issues = 0
-        self.sections_checked = 0
-        self.pages_skipped = 0
-        
-        # Headings and content tracking
-        self.headings = []
-        self.subheadings = []
-        self.images_found = 0
-        
-        print("Initializing DocumentChecker...")  # Debug
-        
-        # Initialize rules with default values
-        self.rules = {
-            'font_name': 'Times New Roman',
-            'heading1_size': 16,
-            'heading2_size': 14,
-            'normal_text_size': 12,
-            'line_spacing': 1.50,
-            'margin_min': 1.75,  # in inches
-            'required_header': 'Project Title',
-            'required_footer_left': 'Dept. name',
-            'required_line_spacing': 1.50,
-            'required_margin': 1.75,  # in inches
-            'lines_per_page': 50,  # Average lines per page (will be adjusted)
-            'pages': [],  # Track page breaks and their line numbers
-            'skip_pages': 14,  # Default value
-            'start_checking_from': 'abstract'  # Default value
-        }
-        print(f"Initial rules: {self.rules}")  # Debug
-        
-        # Update rules from config with default values
-        try:
-            print("\n=== Loading Configuration ===")
-            # Use the global config instance
-            global config
-            if config is None:
-                config = get_config()
-            app_config = config
-            
-            # Debug: Print all attributes of the config
-            print("Available config attributes:", dir(app_config))
-            
-            # Get config values with safe defaults
-            try:
-                skip_pages = app_config.skip_pages
-                print(f"Found skip_pages in config: {skip_pages}")
-            except AttributeError:
-                skip_pages = 14
-                print("Using default skip_pages: 14")
-                
-            try:
-                start_checking = app_config.start_checking_from
-                print(f"Found start_checking_from in config: {start_checking}")
-            except AttributeError:
-                start_checking = 'abstract'
-                print("Using default start_checking_from: 'abstract'")
-            
-            # Ensure start_checking is a string and lowercase it
-            if not isinstance(start_checking, str):
-                start_checking = str(start_checking)
-            start_checking = start_checking.lower()
-            
-            # Update rules
-            self.rules.update({
-                'skip_pages': skip_pages,
-                'start_checking_from': start_checking
-            })
-            
-            print(f"Final rules: skip_pages={self.rules['skip_pages']}, start_checking_from={self.rules['start_checking_from']}")
-            print("=== End of Configuration Loading ===\n")
-            
-        except Exception as e:
-            print(f"\n!!! Error loading config: {e}")
-            import traceback
-            traceback.print_exc()
-            print("!!! Using default configuration")
-            self.rules.update({
-                'skip_pages': 14,
-                'start_checking_from': 'abstract'
-            })
-            
-        self.current_section = 0
-        self.line_number = 0  # Track current line number
-        self.current_page = 1  # Track current page number
-        self.line_page_mapping = {}  # Map line numbers to page numbers
-        
-        # Initialize page skipping and abstract tracking
-        print("\nInitializing page skipping and abstract tracking...")  # Debug
-        print(f"Rules before initialization: {self.rules}")  # Debug
-        
-        try:
-            self.skip_page_count = self.rules['skip_pages']
-            print(f"Set skip_page_count to: {self.skip_page_count}")  # Debug
-        except KeyError:
-            self.skip_page_count = 14
-            print("Using default skip_page_count: 14")  # Debug
-            
-        self.pages_skipped = 0
-        
-        try:
-            start_checking = self.rules['start_checking_from']
-            self.skip_until_abstract = (start_checking == 'abstract')
-            print(f"Set skip_until_abstract to: {self.skip_until_abstract}")  # Debug
-        except KeyError:
-            self.skip_until_abstract = True
-            print("Using default skip_until_abstract: True")  # Debug
-    
-    def check_font(self, run, line_number=None):
-        """Check if font is Times New Roman"""
-        if run.font and run.font.name and run.font.name != self.rules['font_name']:
-            issue = f"Font should be {self.rules['font_name']}, found '{run.font.name}'"
-            if line_number is not None:
-                return [f"Line {line_number}: {issue}"]
-            return [issue]
-        return []
-    
-    def check_font_size(self, para, run, line_number=None):
-        """Check if font size matches the style"""
-        if not run.font or not run.font.size or not run.text.strip():
-            return []
-            
-        size_pt = run.font.size.pt
-        expected_size = self.rules['normal_text_size']  # Default to normal size
-        
-        # Determine expected size based on style
-        style_name = para.style.name.lower()
-        if 'heading' in style_name:
-            if '1' in style_name:
-                expected_size = self.rules['heading1_size']
-            elif '2' in style_name:
-                expected_size = self.rules['heading2_size']
-        
-        if abs(size_pt - expected_size) > 0.1:  # Allow for small rounding differences
-            issue = f"Font size should be {expected_size}pt for '{style_name}', found {size_pt}pt"
-            if line_number is not None:
-                return [f"Line {line_number}: {issue}"]
-            return [issue]
-        return []
-    
-    def check_alignment(self, para, line_number=None):
-        """Check if paragraph alignment is correct"""
-        # Skip if no alignment set (default is left) or empty paragraph
-        if not hasattr(para, 'alignment') or not para.alignment or not para.text.strip():
-            return []
-            
-        # Get the text for context
-        text = para.text.lower().strip()
-        
-        # Default expected alignment is JUSTIFY for normal text
-        expected_alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-        
-        # Check for exceptions (headings, titles, etc.)
-        if any(keyword in text for keyword in ['title', 'chapter', 'abstract', 'acknowledgment', 'appendix', 'reference']):
-            expected_alignment = WD_ALIGN_PARAGRAPH.CENTER
-        
-        if para.alignment != expected_alignment:
-            alignment_names = {
-                WD_ALIGN_PARAGRAPH.LEFT: 'left',
-                WD_ALIGN_PARAGRAPH.CENTER: 'center',
-                WD_ALIGN_PARAGRAPH.RIGHT: 'right',
-                WD_ALIGN_PARAGRAPH.JUSTIFY: 'justify'
-            }
-            issue = f"Alignment should be {alignment_names.get(expected_alignment, 'justify')}, found {alignment_names.get(para.alignment, 'unknown')}"
-            if line_number is not None:
-                return [f"Line {line_number}: {issue}"]
-            return [issue]
-        return []
-    
-    def check_margins(self):
-        try:
-            sections = self.doc.sections
-            for section in sections:
-                try:
-                    left_margin = float(str(section.left_margin).replace('Inches', '').strip())
-                    right_margin = float(str(section.right_margin).replace('Inches', '').strip())
-                    if left_margin < self.rules['margin_min'] or right_margin < self.rules['margin_min']:
-                        self.issues.append(f"Margins should be at least {self.rules['margin_min']} inches on both sides")
-                        break
-                except (ValueError, AttributeError) as e:
-                    self.issues.append("Could not verify margin sizes. Please check margins manually.")
-                    print(f"Margin check error: {e}")
-                    break
-        except Exception as e:
-            print(f"Error in margin checking: {e}")
-            self.issues.append("Error checking document margins.")
-    
-    def add_issue(self, message, line_num=None, line_text=''):
-        """Add an issue with line number and context"""
-        if line_num is not None:
-            # Convert line_num to int if it's a string that can be converted to float
-            try:
-                if isinstance(line_num, str):
-                    line_num = int(round(float(line_num)))
-                elif isinstance(line_num, float):
-                    line_num = int(round(line_num))
-                elif not isinstance(line_num, int):
-                    # If it's not a string, float, or int, use 0 as fallback
-                    line_num = 0
-            except (ValueError, TypeError):
-                line_num = 0
-                
-            self.line_issues.append({
-                'line': line_num,
-                'text': str(line_text)[:100] + ('...' if len(str(line_text)) > 100 else ''),
-                'issue': str(message)
-            })
-        self.issues.append(str(message))
-    
-    def update_section_tracking(self, text):
-        """Update section tracking based on text content"""
-        text_lower = text.lower()
-        
-        # Check for abstract section
-        if 'abstract' in text_lower and not self.after_abstract:
-            self.in_abstract = True
-            self.current_section = 'abstract'
-        # Check for references section
-        elif any(keyword in text_lower for keyword in ['references', 'bibliography']) and not self.in_references:
-            self.in_references = True
-            self.after_abstract = True
-            self.current_section = 'references'
-        # If we were in abstract and now we're not, mark after_abstract as True
-        elif self.in_abstract and not self.after_abstract and text.strip():
-            self.in_abstract = False
-            self.after_abstract = True
-            self.current_section = 'main_content'
-            
-    def check_image_alignment(self, para, line_num):
-        """Check if images are center aligned"""
-        issues = []
-        
-        # Check if paragraph contains an image
-        for run in para.runs:
-            if run._element.xpath('.//a:blip'):  # Check for images in the run
-                # Check paragraph alignment
-                if para.paragraph_format.alignment != WD_ALIGN_PARAGRAPH.CENTER:
-                    issues.append({
-                        'message': "Center align images",
-                        'type': 'formatting',
-                        'severity': 'high',
-                        'line': line_num
-                    })
-                # Check if image is too large (wider than 6 inches)
-                try:
-                    for drawing in run._element.xpath('.//wp:inline'):
-                        extents = drawing.xpath('.//a:ext', namespaces=drawing.nsmap)
-                        if extents:
-                            width = int(extents[0].get('cx', 0)) / 914400  # Convert EMUs to inches
-                            if width > 6:  # If image is wider than 6 inches
-                                issues.append({
-                                    'message': f"Image is too wide ({width:.1f} inches). Resize to be 6 inches or less.",
-                                    'type': 'formatting',
-                                    'severity': 'medium',
-                                    'line': line_num
-                                })
-                except Exception as e:
-                    print(f"Error checking image dimensions: {e}")
-                break  # Only need to check once per paragraph
-                
-        return issues
-        
-    def __init__(self, filepath):
-        self.filepath = filepath
-        self.doc = Document(filepath)
-        self.issues = []
-        self.line_issues = []
-        self.current_section = None
-        self.in_abstract = False
-        self.in_references = False
-        self.after_abstract = False
-        self.total_lines = 0
-        self.lines_with_issues = 0
-        self.sections_checked = 0
-        self.current_paragraph = None
-        self.rules = {
-            'font_name': 'Times New Roman',
-            'heading1_size': 16,
-            'heading2_size': 14,
-            'normal_text_size': 12,
-            'line_spacing': 1.50,
-            'margin_min': 1.75,  # in inches
-            'required_header': 'Project Title',
-            'required_footer_left': 'Dept. name',
-            'required_line_spacing': 1.50,
-            'required_margin': 1.75,  # in inches
-            'lines_per_page': 50,  # Average lines per page (will be adjusted)
-            'pages': []  # Track page breaks and their line numbers
-        }
-        
-        # Define expected chapter structure based on the provided outline
-        self.expected_structure = {
-            "ABSTRACT": {},
-            "CHAPTER 1: INTRODUCTION": {
-                "1.1": "GENERAL",
-                "1.2": "SCOPE OF THE PROJECT",
-                "1.3": "OBJECTIVE",
-                "1.4": "EXISTING SYSTEM",
-                "1.4.1": "EXISTING SYSTEM DISADVANTAGES",
-                "1.4.2": "LITERATURE SURVEY",
-                "1.5": "PROPOSED SYSTEM",
-                "1.5.1": "PROPOSED SYSTEM ADVANTAGE"
-            },
-            "CHAPTER 2: PROJECT DESCRIPTION": {
-                "2.1": "GENERAL",
-                "2.2": "METHODOLOGIES",
-                "2.2.1": "MODULES",
-                "2.2.2": "MODULES DIAGRAMS",
-                "2.3": "UI DESIGN",
-                "2.3.1": "USER INTERFACE DESIGN",
-                "2.3.2": "USERS",
-                "2.4": "GIVEN INPUT EXPECTED OUTPUT",
-                "2.5": "TECHNIQUE OR ALGORITHM USED",
-                "2.5.1": "PROPOSED ALGORITHM"
-            },
-            "CHAPTER 3: REQUIREMENTS ENGINEERING": {
-                "3.1": "GENERAL",
-                "3.2": "HARDWARE REQUIREMENTS",
-                "3.3": "SOFTWARE REQUIREMENTS",
-                "3.4": "FUNCTIONAL REQUIREMENTS",
-                "3.5": "NON-FUNCTIONAL REQUIREMENTS",
-                "3.6": "DOMAIN REQUIREMENT"
-            },
-            "CHAPTER 4: SYSTEM DESIGN": {
-                "4.1": "GENERAL",
-                "4.2": "SYSTEM ARCHITECTURE",
-                "4.3": "UML",
-                "4.3.1": "USE CASE DIAGRAM",
-                "4.3.2": "CLASS DIAGRAM",
-                "4.3.3": "OBJECT DIAGRAM",
-                "4.3.4": "COMPONENT DIAGRAM",
-                "4.3.5": "DEPLOYMENT DIAGRAM",
-                "4.3.6": "SEQUENCE DIAGRAM",
-                "4.3.7": "COLLABORATION DIAGRAM",
-                "4.3.8": "STATE DIAGRAM",
-                "4.3.9": "ACTIVITY DIAGRAM",
-                "4.4": "DATA FLOW DIAGRAM",
-                "4.5": "E-R DIAGRAM",
-                "4.6": "GUI DESIGN",
-                "4.6.1": "COMPONENTS OF GUI",
-                "4.6.2": "FEATURES OF GUI"
-            },
-            "CHAPTER 5: IMPLEMENTATION": {
-                "5.1": "GENERAL",
-                "5.2": "IMPLEMENTATION"
-            },
-            "CHAPTER 6: SNAPSHOTS": {
-                "6.1": "GENERAL",
-                "6.2": "OUTPUT SNAPSHOTS"
-            },
-            "CHAPTER 7: SOFTWARE TESTING": {
-                "7.1": "GENERAL",
-                "7.2": "DEVELOPING METHODOLOGIES",
-                "7.3": "TEST STRATEGY",
-                "7.3.1": "LEVELS OF TESTING",
-                "7.3.2": "TYPES OF TESTING",
-                "7.3.3": "TEST CASE TYPE – GUI",
-                "7.3.4": "TEST DESIGN TECHNIQUES",
-                "7.3.5": "TEST ENVIRONMENT",
-                "7.4": "ACCEPTANCE CRITERIA",
-                "7.4.1": "ACCEPTANCE TESTING",
-                "7.5": "BUILD THE TEST PLAN"
-            },
-            "CHAPTER 8: CONCLUSION AND REFERENCES": {
-                "8.1": "CONCLUSION",
-                "8.2": "FUTURE ENHANCEMENT",
-                "8.3": "REFERENCES"
-            }
-        }
-        
-        # Track found sections for validation
-        self.found_sections = {chapter: {} for chapter in self.expected_structure}
-        self.current_chapter = None
-        self.missing_sections = []
-        self.extra_sections = []
-        
-    def is_chapter_heading(self, text):
-        """Check if the text is a chapter heading"""
-        # Remove any extra whitespace and normalize case for comparison
-        normalized_text = ' '.join(text.strip().upper().split())
-        return normalized_text in self.expected_structure
-    
-    def is_section_heading(self, text):
-        """Check if the text is a section or subsection heading"""
-        if not self.current_chapter:
-            return False
-            
-        # Check if text matches the pattern "X.Y[.Z] TITLE"
-        import re
-        match = re.match(r'^(\d+(?:\.\d+)*)\s+(.+)$', text.strip())
-        if not match:
-            return False
-            
-        section_num, section_text = match.groups()
-        # Clean up section text: remove any trailing numbers and extra spaces
-        cleaned_section_text = re.sub(r'\s*\d+\s*$', '', section_text.strip()).upper()
-        cleaned_section_text = ' '.join(cleaned_section_text.split())  # Normalize spaces
-        
-        # Check if this section exists in the current chapter
-        if section_num in self.expected_structure.get(self.current_chapter, {}):
-            expected_text = self.expected_structure[self.current_chapter][section_num]
-            # Compare with cleaned section text
-            if cleaned_section_text == expected_text:
-                # Mark this section as found
-                self.found_sections[self.current_chapter][section_num] = True
-                # If original text was different, add a warning
-                if section_text.upper() != expected_text:
-                    self.issues.append(f"Warning: Section {section_num} has extra characters. Expected: '{expected_text}', Found: '{section_text}'")
-                return True
-            else:
-                # Found section number but text doesn't match
-                self.issues.append(f"Section {section_num} has incorrect title. Expected: '{expected_text}', Found: '{section_text}'")
-                return True
-                
-        # If we get here, it's either an extra section or a section in the wrong chapter
-        for chapter, sections in self.expected_structure.items():
-            if section_num in sections and cleaned_section_text == sections[section_num]:
-                self.issues.append(f"Section {section_num} '{section_text}' appears to be in the wrong chapter. Expected in: {chapter}")
-                return True
-                
-        # If we get here, it's an extra section not in our expected structure
-        self.extra_sections.append(f"{section_num} {section_text}")
-        return True
-    
-    def validate_structure(self):
-        """Validate the document structure against expected headings"""
-        # Check for missing chapters
-        for chapter in self.expected_structure:
-            if chapter not in self.found_sections or not self.found_sections[chapter]:
-                self.missing_sections.append(f"Missing chapter: {chapter}")
-            
-            # Check for missing sections in each chapter
-            if chapter in self.found_sections:
-                for section_num, section_text in self.expected_structure[chapter].items():
-                    if section_num not in self.found_sections[chapter]:
-                        self.missing_sections.append(f"Missing section: {chapter} -> {section_num} {section_text}")
-        
-        # Add missing sections to issues
-        if self.missing_sections:
-            self.issues.append("Document structure issues found:")
-            self.issues.extend(self.missing_sections)
-            
-        # Add extra sections to issues
-        if self.extra_sections:
-            self.issues.append("\nUnexpected sections found in document:")
-            self.issues.extend(self.extra_sections)
-    
-    def check_document_structure(self):
-        """Check the document structure against the expected format"""
-        # Reset tracking variables
-        self.issues = []
-        self.found_sections = {chapter: {} for chapter in self.expected_structure}
-        self.current_chapter = None
-        self.missing_sections = []
-        self.extra_sections = []
-        
-        # First pass: identify chapters and sections
-        for para in self.doc.paragraphs:
-            line_text = para.text.strip()
-            if not line_text:
-                continue
-                
-            # Check for chapter headings
-            if self.is_chapter_heading(line_text):
-                self.current_chapter = ' '.join(line_text.upper().split())
-                continue
-                
-            # Check for section headings
-            if self.current_chapter:
-                self.is_section_heading(line_text)
-        
-        # Validate the structure
-        self.validate_structure()
-        
-        return {
-            'missing_sections': self.missing_sections,
-            'extra_sections': self.extra_sections,
-            'issues': self.issues
-        }
-        
-    def check_document(self):
-        """Main method to check the entire document"""
-        # First check document structure
-        structure_results = self.check_document_structure()
-        
-        # Reset tracking variables for other checks
-        self.issues = []
-        self.line_issues = []
-        self.total_lines = 0
-        self.lines_with_issues = 0
-        self.sections_checked = 0
-        self.current_page = 1
-        self.line_page_mapping = {}
-        self.current_section = None
-        self.in_abstract = False
-        self.in_references = False
-        self.after_abstract = False
-        self.pages_skipped = 0
-        self.headings = []
-        self.subheadings = []
-        self.images_found = 0
-        
-        # Initialize rules if not already set
-        if not hasattr(self, 'rules') or not self.rules:
-            self.rules = {}
-            
-        # Initialize pages list in rules
-        self.rules['pages'] = []
-        
-        # Set default values if not present
-        if 'start_checking_from' not in self.rules:
-            self.rules['start_checking_from'] = 'abstract'
-        if 'skip_pages' not in self.rules:
-            self.rules['skip_pages'] = 14
-            
-        # Now it's safe to access these values
-        self.skip_until_abstract = (self.rules['start_checking_from'] == 'abstract')
-        self.skip_page_count = self.rules['skip_pages']
-        
-        print(f"Will skip first {self.skip_page_count} pages")
-        
-        # Check document-wide settings
-        self.check_margins()
-        self.check_page_numbering()
-        
-        # First pass: count total lines and find page breaks
-        total_paragraphs = sum(1 for _ in self.doc.paragraphs if _.text.strip())
-        self.rules['lines_per_page'] = max(40, min(60, total_paragraphs // 10))
-        
-        # Track if we're still in the first 14 pages
-        in_skipped_pages = True
-        
-        # Second pass: check content
-        for para in self.doc.paragraphs:
-            self.total_lines += 1
-            self.current_paragraph = para
-            line_text = para.text.strip()
-            
-            # Update page tracking first - this updates self.current_page
-            page_break_found = self.update_page_break(para)
-            
-            # Skip all content in first 14 pages
-            if in_skipped_pages:
-                if page_break_found:
-                    print(f"Skipping page {self.current_page}")
-                    if self.current_page >= self.skip_page_count:
-                        in_skipped_pages = False
-                        print(f"Reached page {self.current_page}, starting checks...")
-                continue
-                
-            # From here on, we're past the first 14 pages
-            
-            # Skip empty paragraphs unless they contain page breaks
-            if not line_text and not page_break_found:
-                continue
-                
-            # Check for chapter headings
-            if self.is_chapter_heading(line_text):
-                self.current_chapter = ' '.join(line_text.upper().split())
-                continue
-                
-            # Check for section headings
-            if self.current_chapter and self.is_section_heading(line_text):
-                continue
-                
-            # Update section tracking
-            prev_section = self.current_section
-            self.update_section_tracking(line_text)
-            
-            # Handle abstract checking if needed
-            if self.skip_until_abstract and self.in_abstract:
-                self.skip_until_abstract = False
-                self.after_abstract = True
-                
-            if prev_section != self.current_section:
-                self.sections_checked += 1
-            
-            # Skip empty paragraphs unless they contain page breaks
-            if not line_text and not page_break_found:
-                continue
-                
-            # Initialize issues for this line
-            line_has_issues = False
-            line_issues = []
-            
-            # Check paragraph-level formatting
-            alignment_issues = self.check_alignment(para, self.total_lines)
-            if alignment_issues:
-                line_issues.extend(alignment_issues)
-                line_has_issues = True
-                
-            # Check for images and their alignment
-            image_issues = self.check_image_alignment(para, self.total_lines)
-            if image_issues:
-                line_issues.extend(image_issues)
-                line_has_issues = True
-                self.images_found += 1
-            
-            # Check runs within the paragraph
-            for run in para.runs:
-                font_issues = self.check_font(run, self.total_lines)
-                if font_issues:
-                    line_issues.extend(font_issues)
-                    line_has_issues = True
-                
-                size_issues = self.check_font_size(para, run, self.total_lines)
-                if size_issues:
-                    line_issues.extend(size_issues)
-                    line_has_issues = True
-                
-                color_issues = self.check_text_color(run, self.total_lines)
-                if color_issues:
-                    line_issues.extend(color_issues)
-                    line_has_issues = True
-            
-            # Add line to issues if it has any problems
-            if line_has_issues or page_break_found:
-                self.lines_with_issues += 1
-                self.line_issues.append({
-                    'line_number': self.total_lines,
-                    'page_number': self.current_page,
-                    'text': line_text[:200] + ('...' if len(line_text) > 200 else ''),
-                    'issues': line_issues,
-                    'is_page_break': page_break_found
-                })
-                if line_issues:  # Only add to main issues if there are actual issues
-                    self.issues.extend(line_issues)
-        
-        # Check headers and footers
-        try:
-            header_footer_issues = self.check_headers_footers()
-            if isinstance(header_footer_issues, list) and header_footer_issues:
-                self.issues.extend(header_footer_issues)
-        except Exception as e:
-            print(f"Error checking headers/footers: {e}")
-            self.issues.append("Error checking headers and footers")
-            
-        # Add structure issues from first pass
-        try:
-            if structure_results and isinstance(structure_results, dict):
-                structure_issues = structure_results.get('issues', [])
-                if isinstance(structure_issues, list) and structure_issues:
-                    self.issues.extend(structure_issues)
-        except Exception as e:
-            print(f"Error processing structure results: {e}")
-            self.issues.append("Error processing document structure")
-            
-        # Calculate statistics
+# Rule profiles (fonts, sizes, header/footer text, chapter outline) declared as
+# JSON files; validated and compiled once per process
+app.config['RULE_PROFILES_DIR'] = os.environ.get('RULE_PROFILES_DIR', PROFILES_DIR)
+RULE_PROFILES = configured_profiles()
+
+def __getattr__(name):
+    """Import the checking engine (python-docx, lxml) only once something asks for it"""
+    if name == 'DocumentChecker':
+        from checker import DocumentChecker
+        return DocumentChecker
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+check_pool = CheckPool(
+    workers=app.config['CHECK_WORKERS'],
+    queue_size=app.config['CHECK_QUEUE_SIZE'],
+    cpu_seconds=app.config['CHECK_CPU_SECONDS'],
+    timeout=app.config['CHECK_TIMEOUT']
+)
+slow_pool = CheckPool(
+    workers=app.config['SLOW_LANE_WORKERS'] if app.config['CHECK_WORKERS'] > 0 else 0,
+    queue_size=2,
+    cpu_seconds=app.config['SLOW_LANE_TIMEOUT'],
+    timeout=app.config['SLOW_LANE_TIMEOUT']
+)
+
+result_cache = ResultCache(
+    directory=app.config['RESULT_CACHE_DIR'] or None,
+    max_entries=app.config['RESULT_CACHE_ENTRIES'],
+    max_disk_bytes=app.config['RESULT_CACHE_DISK_MB'] * 1024 * 1024,
+    ttl=app.config['RESULT_CACHE_TTL']
+)
+
+# Same gzipped-JSON store, keyed by opaque result IDs instead of content hashes
+result_store = ResultCache(
+    directory=app.config['RESULT_STORE_DIR'] or None,
+    max_entries=32,
+    max_disk_bytes=app.config['RESULT_STORE_DISK_MB'] * 1024 * 1024,
+    ttl=app.config['RESULT_STORE_TTL']
+)
+RESULT_ID = re.compile(r'^[A-Za-z0-9_-]{22}$')
+
+def new_result_id():
+    return secrets.token_urlsafe(16)
+
+# Rolling per-rule timings of recent checks, shown on the admin dashboard
+timing_histograms = TimingHistograms()
+
+def debug_requested():
+    return (request.args.get('debug') or request.form.get('debug', '')) not in ('', '0')
+
+def take_timings(issues):
+    """Remove a check's timing breakdown from its issues and record it"""
+    timings = issues.pop('timings', None)
+    if timings is not None:
+        timing_histograms.record(timings)
+    return timings
+
+check_log = CheckLog(app.config['CHECK_LOG_PATH'], retention_days=app.config['CHECK_LOG_RETENTION_DAYS'] or None)
+if config.document_checks:
+    log.warning("config.json holds %d checks recorded by an earlier version; "
+                "run `python check_log.py` once to move them into the check log", len(config.document_checks))
+
+def log_document_check(issues, filename, user_ip):
+    """Record a finished check in the admin check log"""
+    summary = issues.get('summary', {})
+    try:
+        total_issues = summary.get('total_issues', len(issues.get('issues', [])))
+        check_log.append(secure_filename(filename), total_issues, user_ip, {
+            'page_count': summary.get('page_count', ''),
+            'line_count': summary.get('total_lines', ''),
+            'sections_checked': summary.get('sections_checked', '')
+        })
+    except Exception as e:
+        log.warning("Could not log document check: %s", e)
+
+def check_log_filters(args):
+    """Check log filters from query parameters (from/to dates, filename, min/max issues)"""
+    filters = {
+        'start': args.get('from') or None,
+        'filename': args.get('filename') or None,
+        'min_issues': args.get('min_issues', type=int),
+        'max_issues': args.get('max_issues', type=int)
+    }
+    end = args.get('to')
+    if end:
         try:
-            issue_percentage = (self.lines_with_issues / max(1, self.total_lines)) * 100 if self.total_lines > 0 else 0
-        except Exception as e:
-            print(f"Error calculating statistics: {e}")
-            issue_percentage = 0
-        
-        # Prepare result with proper error handling
-        result = {
-            'total_issues': len(self.issues) if hasattr(self, 'issues') else 0,
-            'line_issues': self.line_issues if hasattr(self, 'line_issues') else [],
-            'total_lines': getattr(self, 'total_lines', 0),
-            'lines_with_issues': getattr(self, 'lines_with_issues', 0),
-            'issue_percentage': round(float(issue_percentage), 2),
-            'sections_checked': getattr(self, 'sections_checked', 0),
-            'images_found': getattr(self, 'images_found', 0),
-            'structure_issues': {
-                'missing_sections': structure_results.get('missing_sections', []) if isinstance(structure_results, dict) else [],
-                'extra_sections': structure_results.get('extra_sections', []) if isinstance(structure_results, dict) else []
-            },
-            'pages_skipped': getattr(self, 'pages_skipped', 0),
-            'issues': self.issues if hasattr(self, 'issues') else []
-        }
-        
-        # Process line issues to ensure they have all required fields
-        processed_line_issues = []
-        for issue in self.line_issues:
-            if not isinstance(issue, dict):
-                continue
-                
-            processed_issue = {
-                'line_number': issue.get('line_number', 0),
-                'text': issue.get('text', ''),
-                'page_number': issue.get('page_number', 1),
-                'is_page_break': issue.get('is_page_break', False),
-                'issues': issue.get('issues', [])
-            }
-            processed_line_issues.append(processed_issue)
-        
-        return {
-            'issues': self.issues,
-            'line_issues': processed_line_issues,
-            'headings': self.headings,
-            'subheadings': self.subheadings,
-            'summary': summary
-        }
-        
-    def check_headers_footers(self):
-        """Check headers and footers after abstract"""
-        issues = []
-        if not self.after_abstract:
-            return issues
-            
-        for section in self.doc.sections:
-            # Check header
-            if section.header:
-                header_text = ' '.join([p.text for p in section.header.paragraphs])
-                if self.rules['required_header'].lower() not in header_text.lower():
-                    issues.append(f"Header should contain: '{self.rules['required_header']}'")
-            
-            # Check footer
-            if section.footer:
-                footer_text = ' '.join([p.text for p in section.footer.paragraphs])
-                if (self.rules['required_footer_left'].lower() not in footer_text.lower() or 
-                    'page' not in footer_text.lower()):
-                    issues.append("Footer should contain department name and page number")
-                    
-        return issues
-            
-    def estimate_page_number(self, line_num):
-        """Estimate page number based on line number and content"""
-        # Convert line_num to int to ensure it's a valid dictionary key
-        line_num_int = int(round(line_num))
-        
-        # If we've already mapped this line to a page, return that
-        if line_num_int in self.line_page_mapping:
-            return self.line_page_mapping[line_num_int]
-            
-        # Otherwise estimate based on lines per page
-        estimated_page = (line_num_int // self.rules['lines_per_page']) + 1
-        self.line_page_mapping[line_num_int] = estimated_page
-        return estimated_page
-        
-    def update_page_break(self, para):
-        """Check if paragraph contains a page break and update current page"""
-        # Check for explicit page breaks
-        if 'w:br' in para._p.xml and 'type="page"' in para._p.xml:
-            self.current_page += 1
-            self.rules['pages'].append({
-                'page': self.current_page,
-                'line': self.total_lines,
-                'content': para.text[:100] + ('...' if len(para.text) > 100 else '')
-            })
-            return True
-        return False
-    
-    def check_page_numbering(self):
-        """Check page numbering format (Roman before abstract, numbers after)"""
-        # This is a simplified check as python-docx has limited access to page numbers
-        self.issues.append("Note: Page numbers are estimated. Please verify manually - Roman numerals before abstract, numbers after")
-        
-    def check_page_number_sequence(self):
-        """Check if page numbers follow the correct sequence"""
-        # This is a simplified check as detailed page number sequence checking is complex
-        # and would require more sophisticated document analysis
-        return []
-    
+            # The end date is inclusive, the log's end bound is not
+            filters['end'] = (datetime.fromisoformat(end) + timedelta(days=1)).date().isoformat()
+        except ValueError:
+            pass
+    return filters
 
-    def check_lists(self):
-        """Check that lists use bullets, not Roman numerals"""
-        for para in self.doc.paragraphs:
-            if para.style.name.startswith('List'):
-                if 'List Number' in para.style.name:
-                    self.issues.append("Use bullet points for lists, not numbered lists")
-                    break  # Only show this warning once
-    
-    def check_text_color(self, run, line_number=None):
-        """Check if text color is black"""
-        if run.font and run.font.color and run.font.color.rgb and run.font.color.rgb != RGBColor(0, 0, 0):
-            issue = "Text color should be black"
-            if line_number is not None:
-                return [f"Line {line_number}: {issue}"]
-            return [issue]
-        return []
+# Version of what a check returns. Bump it whenever the checker's output changes
+# (findings, result fields or their shape) so cached results from older code,
+# which outlive deploys on disk, are no longer served.
+# 2: line findings stored as issue codes, the top-level list holds ranges
+# 3: image widths read from wp:extent, so wide images are flagged again
+# 4: margins compared in inches, so narrow margins are flagged
+CHECKER_VERSION = 4
+
+def rules_fingerprint(profile):
+    """Hash of everything that can change a check result under `profile`: its rules and the checker version"""
+    rules = {
+        'checker_version': CHECKER_VERSION,
+        'profile': profile.hash
+    }
+    return hashlib.sha256(json.dumps(rules, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+# Request IDs tie together the log records of one request, including those
+# written by the pool worker that checks its document
+REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+@app.before_request
+def assign_request_id():
+    incoming = request.headers.get('X-Request-ID', '')
+    request.request_id = incoming if REQUEST_ID.match(incoming) else uuid.uuid4().hex[:16]
+    request.request_id_token = request_id.set(request.request_id)
+
+@app.after_request
+def add_request_id_header(response):
+    response.headers['X-Request-ID'] = request.request_id
+    return response
+
+@app.teardown_request
+def reset_request_id(exc=None):
+    token = getattr(request, 'request_id_token', None)
+    if token is not None:
+        request_id.reset(token)
 
 # Admin authentication decorator
 def admin_required(f):
@@ -851,13 +241,17 @@ def admin_required(f):
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', profiles=RULE_PROFILES.values(), default_profile=DEFAULT_PROFILE)
 
 # Admin routes
 @app.route('/admin', methods=['GET'])
 @admin_required
 def admin_dashboard():
-    return render_template('admin_dashboard.html', config=config)
+    filters = check_log_filters(request.args)
+    return render_template('admin_dashboard.html', config=config, cache_stats=result_cache.stats(),
+                           checks=check_log.query(limit=100, **filters),
+                           check_count=check_log.count(**filters), filters=request.args,
+                           timing_stats=timing_histograms.stats())
 
 @app.route('/admin/login', methods=['GET', 'POST'])
 def admin_login():
@@ -897,34 +291,55 @@ def update_settings():
 @app.route('/admin/export-checks')
 @admin_required
 def export_checks():
-    """Export document checks as CSV"""
+    """Export document checks as CSV, streamed straight from the check log
+    
+    Accepts the dashboard filters; with ?gzip=1 the download is gzip-compressed.
+    """
     import csv
+    import zlib
     from io import StringIO
-    from flask import Response
     
-    # Create CSV in memory
-    si = StringIO()
-    cw = csv.writer(si)
+    checks = check_log.iter(**check_log_filters(request.args))
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
     
-    # Write header
-    cw.writerow(['Timestamp', 'Filename', 'Issues Found', 'IP Address', 'Page Count', 'Line Count', 'Sections Checked'])
+    def rows():
+        # Rows are written into a small buffer that is flushed every batch, so
+        # memory stays constant however long the history is
+        si = StringIO()
+        cw = csv.writer(si)
+        cw.writerow(['Timestamp', 'Filename', 'Issues Found', 'IP Address', 'Page Count', 'Line Count', 'Sections Checked'])
+        for count, check in enumerate(checks, 1):
+            cw.writerow([
+                check['timestamp'],
+                check['filename'],
+                check['issues_found'],
+                check['user_ip'],
+                check['metadata'].get('page_count', ''),
+                check['metadata'].get('line_count', ''),
+                check['metadata'].get('sections_checked', '')
+            ])
+            if count % 500 == 0:
+                yield si.getvalue()
+                si.seek(0)
+                si.truncate()
+        yield si.getvalue()
     
-    # Write data
-    for check in config.document_checks:
-        cw.writerow([
-            check['timestamp'],
-            check['filename'],
-            check['issues_found'],
-            check['user_ip'],
-            check['metadata'].get('page_count', ''),
-            check['metadata'].get('line_count', ''),
-            check['metadata'].get('sections_checked', '')
-        ])
+    def gzipped(chunks):
+        compressor = zlib.compressobj(wbits=31)  # gzip container
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8'))
+            if data:
+                yield data
+        yield compressor.flush()
     
-    # Create response
-    output = si.getvalue()
+    if compress:
+        return Response(
+            gzipped(rows()),
+            mimetype="application/gzip",
+            headers={"Content-disposition": "attachment; filename=document_checks.csv.gz"}
+        )
     return Response(
-        output,
+        rows(),
         mimetype="text/csv",
         headers={"Content-disposition": "attachment; filename=document_checks.csv"}
     )
@@ -935,14 +350,10 @@ def delete_check():
     """Delete a specific document check"""
     try:
         data = request.get_json()
-        index = data.get('index')
-        
-        if index is None or not isinstance(index, int) or index < 0 or index >= len(config.document_checks):
-            return jsonify({'success': False, 'error': 'Invalid check index'}), 400
+        check_id = data.get('id')
         
-        # Remove the check at the specified index
-        config.document_checks.pop(index)
-        config.save()
+        if not isinstance(check_id, int) or not check_log.delete(check_id):
+            return jsonify({'success': False, 'error': 'Invalid check id'}), 400
         
         return jsonify({'success': True})
     except Exception as e:
@@ -953,8 +364,7 @@ def delete_check():
 def clear_all_checks():
     """Clear all document checks"""
     try:
-        config.document_checks = []
-        config.save()
+        check_log.clear()
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -987,86 +397,184 @@ def show_results():
                            subheadings=result.get('subheadings', []),
                            issues=result.get('issues', []))
     except json.JSONDecodeError as e:
-        print(f"Error decoding JSON: {e}")
+        log.warning("Error decoding JSON: %s", e)
         flash('Invalid results data. Please try uploading your document again.')
         return redirect(url_for('index'))
-    except Exception as e:
-        print(f"Error in show_results: {str(e)}")
+    except Exception:
+        log.exception("Error in show_results")
         flash('An error occurred while processing the results.')
         return redirect(url_for('index'))
 
-@app.route('/upload', methods=['POST'])
-def upload_file():
+def paginate(items, page, per_page):
+    """Slice one page out of `items`; returns (page items, pagination info)"""
+    pages = max(1, -(-len(items) // per_page))
+    page = min(max(1, page), pages)
+    start = (page - 1) * per_page
+    return items[start:start + per_page], {
+        'page': page,
+        'pages': pages,
+        'total': len(items),
+        'first': start + 1 if items else 0,
+        'last': min(start + per_page, len(items))
+    }
+
+@app.route('/results/<result_id>')
+def stored_results(result_id):
+    """Render a stored result, one page of line issues at a time"""
+    result = result_store.get(result_id) if RESULT_ID.match(result_id) else None
+    if result is None:
+        flash('These results have expired. Please upload your document again.')
+        return redirect(url_for('index'))
+    
+    per_page = app.config['RESULT_LINES_PER_PAGE']
+    line_issues, line_pages = paginate(result.get('line_issues', []), request.args.get('page', 1, type=int), per_page)
+    issues, issue_pages = paginate(result.get('issues', []), request.args.get('issues_page', 1, type=int), per_page)
+    # Stored results keep compact issue codes; only the page shown is rendered
+    return render_template('results.html',
+                           result_id=result_id,
+                           filename=result.get('filename', 'Document'),
+                           summary=result.get('summary', {}),
+                           line_issues=render_line_issues(line_issues),
+                           line_pages=line_pages,
+                           headings=result.get('headings', []),
+                           subheadings=result.get('subheadings', []),
+                           issues=[render_issue(issue) for issue in issues],
+                           issue_pages=issue_pages)
+
+def store_result(result, result_id=None):
+    """Keep a result server-side and return its ID"""
+    result_id = result_id or new_result_id()
+    result_store.put(result_id, result)
+    return result_id
+
+def selected_profile():
+    """Rule profile named by the upload's `profile` field with the admin settings applied, or None if unknown"""
+    name = request.form.get('profile') or request.args.get('profile') or DEFAULT_PROFILE
+    profile = RULE_PROFILES.get(name)
+    return with_rules(profile, config.rule_overrides()) if profile else None
+
+def read_upload(profile):
+    """Validate the uploaded file and hash it where it lies
+    
+    Returns (upload stream, cache key, check pool, None) or (None, None, None,
+    error response). The stream is werkzeug's spooled buffer, rewound, so the
+    checker opens the .docx from it without another copy in memory or on disk.
+    The pool is the slow lane for documents pre-flight found to be large.
+    """
     # Check if the post request has the file part
     if 'file' not in request.files:
-        return jsonify({'error': 'No file part in the request'}), 400
+        return None, None, None, (jsonify({'error': 'No file part in the request'}), 400)
     
     file = request.files['file']
     if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
+        return None, None, None, (jsonify({'error': 'No selected file'}), 400)
     
     if not (file and allowed_file(file.filename)):
-        return jsonify({'error': 'Invalid file type. Please upload a .docx file'}), 400
+        return None, None, None, (jsonify({'error': 'Invalid file type. Please upload a .docx file'}), 400)
     
-    # Create a temporary file in the system's temp directory
-    temp_file = None
-    temp_file_path = None
+    stream = file.stream
+    stream.seek(0, os.SEEK_END)
+    if stream.tell() == 0:
+        return None, None, None, (jsonify({'error': 'Uploaded file is empty'}), 400)
     
+    # Reject broken, encrypted and zip-bomb uploads from the zip metadata alone
+    from preflight import PreflightError, preflight
     try:
-        # Save file data to memory
-        file_data = file.read()
-        if not file_data:
-            return jsonify({'error': 'Uploaded file is empty'}), 400
-        
-        # Create a temporary file with a .docx extension
-        try:
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.docx')
-            temp_file_path = temp_file.name
-            temp_file.write(file_data)
-            temp_file.close()
-        except Exception as e:
-            return jsonify({'error': f'Error creating temporary file: {str(e)}'}), 500
-        
-        # Process the document
+        report = preflight(stream, max_document_mb=app.config['PREFLIGHT_MAX_DOCUMENT_MB'],
+                           slow_document_mb=app.config['SLOW_LANE_DOCUMENT_MB'],
+                           max_total_mb=app.config['PREFLIGHT_MAX_TOTAL_MB'],
+                           max_ratio=app.config['PREFLIGHT_MAX_RATIO'])
+    except PreflightError as e:
+        log.info("Rejected %s before parsing (%s): %s", secure_filename(file.filename), e.reason, e)
+        status = 413 if e.reason == 'too_large' else 400
+        return None, None, None, (jsonify({'error': str(e), 'reason': e.reason}), status)
+    
+    stream.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: stream.read(1 << 20), b''):
+        digest.update(block)
+    stream.seek(0)
+    cache_key = content_key(digest.hexdigest(), rules_fingerprint(profile))
+    if report.slow:
+        log.info("Routing %s to the slow lane (%d MB document part)",
+                 secure_filename(file.filename), report.document_bytes >> 20)
+    return stream, cache_key, slow_pool if report.slow else check_pool, None
+
+def busy_response(e):
+    """429 response for a full check queue"""
+    return jsonify({'error': 'The server is busy checking other documents. Please try again shortly.'}), 429, {'Retry-After': str(e.retry_after)}
+
+def build_result(issues, filename):
+    """Shape a check_document result for the client, with issues still compact
+    
+    Line findings stay Issue codes and IssueRanges until they are shown; JSON
+    responses go through render_result.
+    """
+    # Process line issues - ensure they're in the correct format
+    processed_line_issues = []
+    try:
+        for issue in (issues.get('line_issues') or []):
+            if isinstance(issue, dict) and 'issues' in issue and issue['issues']:
+                processed_line_issues.append({
+                    'line_number': issue.get('line_number', 0),
+                    'issues': issue['issues'],
+                    'text': issue.get('text', '')
+                })
+    except Exception as e:
+        log.warning("Error processing line issues: %s", e)
+    
+    # Count lines with issues
+    lines_with_issues = len(processed_line_issues)
+        
+    # Prepare the result
+    return {
+        'filename': secure_filename(filename),
+        'timestamp': datetime.now().isoformat(),
+        'issues': issues.get('issues', []) if isinstance(issues, dict) else (issues or []),
+        'summary': {
+            'total_issues': issues.get('summary', {}).get('total_issues', len(issues.get('issues', []))) if isinstance(issues, dict) else len(issues or []),
+            'lines_checked': len(issues.get('line_issues') or []),
+            'lines_with_issues': lines_with_issues,
+            'sections_checked': issues.get('summary', {}).get('sections_checked', 0),
+            'heading_count': len(issues.get('headings', [])),
+            'subheading_count': len(issues.get('subheadings', []))
+        },
+        'line_issues': processed_line_issues,
+        'headings': issues.get('headings', []),
+        'subheadings': issues.get('subheadings', [])
+    }
+
+@app.route('/upload', methods=['POST'])
+def upload_file():
+    profile = selected_profile()
+    if profile is None:
+        return jsonify({'error': 'Unknown rule profile'}), 400
+    upload, cache_key, pool, error = read_upload(profile)
+    if error:
+        return error
+    
+    debug = debug_requested()
+    timings = None
+    try:
+        # Process the document on the check pool unless this exact file was
+        # already checked under the same rules
         try:
-            checker = DocumentChecker(temp_file_path)
-            issues = checker.check_document()
+            issues = result_cache.get(cache_key)
+            if issues is None:
+                log.info("Checking %s with profile %s", secure_filename(request.files['file'].filename), profile.name)
+                issues = pool.check(upload, profile.name, rules=dict(profile.overrides),
+                                    timings=debug or app.config['CHECK_TIMINGS'])
+                timings = take_timings(issues)
+                result_cache.put(cache_key, issues)
+        except QueueFull as e:
+            return busy_response(e)
+        except CheckTimeout as e:
+            return jsonify({'error': f'Error processing document: {str(e)}'}), 503
         except Exception as e:
             return jsonify({'error': f'Error processing document: {str(e)}'}), 500
         
-        # Process line issues - ensure they're in the correct format
-        processed_line_issues = []
-        try:
-            for issue in (checker.line_issues or []):
-                if isinstance(issue, dict) and 'issues' in issue and issue['issues']:
-                    processed_line_issues.append({
-                        'line_number': issue.get('line_number', 0),
-                        'issues': issue['issues'],
-                        'text': issue.get('text', '')
-                    })
-        except Exception as e:
-            print(f"Warning: Error processing line issues: {str(e)}")
-        
-        # Count lines with issues
-        lines_with_issues = len(processed_line_issues)
-            
-        # Prepare the result
-        result = {
-            'filename': secure_filename(file.filename),
-            'timestamp': datetime.now().isoformat(),
-            'issues': issues.get('issues', []) if isinstance(issues, dict) else (issues or []),
-            'summary': {
-                'total_issues': len(issues.get('issues', [])) if isinstance(issues, dict) else len(issues or []),
-                'lines_checked': len(checker.line_issues or []),
-                'lines_with_issues': lines_with_issues,
-                'sections_checked': checker.sections_checked if hasattr(checker, 'sections_checked') else 0,
-                'heading_count': len(checker.headings) if hasattr(checker, 'headings') else 0,
-                'subheading_count': len(checker.subheadings) if hasattr(checker, 'subheadings') else 0
-            },
-            'line_issues': processed_line_issues,
-            'headings': getattr(checker, 'headings', []),
-            'subheadings': getattr(checker, 'subheadings', [])
-        }
+        result = build_result(issues, request.files['file'].filename)
+        log_document_check(issues, request.files['file'].filename, request.remote_addr)
         
         # Store minimal data in session
         try:
@@ -1076,26 +584,133 @@ def upload_file():
                 'summary': result['summary']
             }
         except Exception as e:
-            print(f"Warning: Could not store session data: {str(e)}")
+            log.warning("Could not store session data: %s", e)
+        
+        result_id = store_result(result)
         
         # Return the result data
-        return jsonify({
+        response = {
             'success': True,
-            'result': result
-        })
+            'result': render_result(result),
+            'result_id': result_id,
+            'result_url': url_for('stored_results', result_id=result_id)
+        }
+        if debug and timings is not None:
+            response['timings'] = timings
+        return jsonify(response)
             
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("Error handling upload")
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
-        
-    finally:
-        # Clean up the temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except Exception as e:
-                print(f"Error removing temporary file: {e}")
+
+# Background check jobs
+job_store = JobStore()
+
+def render_page(event):
+    """A checker page event with its line issues rendered for event-stream clients"""
+    return dict(event, line_issues=render_line_issues(event.get('line_issues', [])))
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Start checking a document and return its job ID immediately"""
+    profile = selected_profile()
+    if profile is None:
+        return jsonify({'error': 'Unknown rule profile'}), 400
+    upload, cache_key, pool, error = read_upload(profile)
+    if error:
+        return error
+    
+    filename = request.files['file'].filename
+    user_ip = request.remote_addr
+    job = job_store.create(secure_filename(filename))
+    # The ID is chosen now so the result URL can be built inside the request
+    result_id = new_result_id()
+    result_url = url_for('stored_results', result_id=result_id)
+    debug = debug_requested()
+    
+    def finish(issues, timings=None):
+        result = build_result(issues, filename)
+        store_result(result, result_id)
+        job_result = dict(render_result(result), result_id=result_id, result_url=result_url)
+        if debug and timings is not None:
+            job_result['timings'] = timings
+        job.finish(job_result)
+        log_document_check(issues, filename, user_ip)
+    
+    def job_done(future):
+        try:
+            issues = future.result()
+            timings = take_timings(issues)
+            result_cache.put(cache_key, issues)
+            finish(issues, timings)
+        except Exception as e:
+            log.warning("Job %s failed: %s", job.id, e)
+            job.fail(f'Error processing document: {str(e)}')
+    
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        finish(cached)
+    else:
+        log.info("Job %s checking %s with profile %s", job.id, secure_filename(filename), profile.name)
+        try:
+            # The job outlives this request and its upload stream, so it gets the bytes
+            future = pool.submit(upload.read(), progress=lambda event: job.add_page(render_page(event)),
+                                 profile=profile.name, rules=dict(profile.overrides),
+                                 timings=debug or app.config['CHECK_TIMINGS'])
+        except QueueFull as e:
+            # Nothing will ever finish the job, and only finished jobs expire
+            job_store.discard(job.id)
+            return busy_response(e)
+        except Exception:
+            job_store.discard(job.id)
+            raise
+        # The callback runs on a pool thread; carry this request's ID over to it
+        context = contextvars.copy_context()
+        future.add_done_callback(lambda done: context.run(job_done, done))
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status_url': url_for('job_status', job_id=job.id),
+        'events_url': url_for('job_events', job_id=job.id),
+        'result_url': result_url
+    }), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream a job's page results as server-sent events"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    
+    try:
+        position = int(request.headers.get('Last-Event-ID', -1)) + 1
+    except ValueError:
+        position = 0
+    
+    def stream():
+        index = position
+        while True:
+            events = job.wait_for_events(index, timeout=15)
+            if not events:
+                if job.is_finished and index >= len(job.events):
+                    return
+                yield ': keep-alive\n\n'
+                continue
+            for event in events:
+                yield f"id: {index}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                index += 1
+                if event['type'] in ('done', 'error'):
+                    return
+    
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 # Vercel handler
 app = app
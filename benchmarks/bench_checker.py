@@ -0,0 +1,168 @@
+"""Benchmark DocumentChecker on synthetic reports and the sample uploads.
+
+Each document is measured in a fresh process so peak RSS is its own. For
+every document the suite times check_document_structure, check_document,
+check_headers_footers and the /upload round trip through the Flask test
+client, and reports ops/sec, p50/p99 latency and peak RSS:
+
+    python benchmarks/bench_checker.py
+    python benchmarks/bench_checker.py --pages 10 100 1000 --iterations 3
+    python benchmarks/bench_checker.py --save-baseline
+
+When benchmarks/baselines.json exists, p50 latencies are compared against it
+and the exit status is 1 if any benchmark is slower than the tolerance.
+"""
+import argparse
+import contextlib
+import glob
+import json
+import math
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BASELINES = os.path.join(ROOT, 'benchmarks', 'baselines.json')
+BENCHMARKS = ['structure', 'check_document', 'headers_footers', 'upload']
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024  # bytes on macOS, KB elsewhere
+
+
+def bench_document(path, iterations, benchmarks):
+    """Run the benchmarks for one document; executed in a fresh process"""
+    # Keep the app self-contained: in-process checks, no caches or files on disk
+    os.environ.update(CHECK_WORKERS='0', RESULT_CACHE_DIR='', RESULT_STORE_DIR='', CHECK_LOG_PATH=':memory:', LOG_LEVEL='WARNING')
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import app
+        import check_pool
+        client = app.app.test_client()
+
+        def structure():
+            app.DocumentChecker(path).check_document_structure()
+
+        def check_document():
+            app.DocumentChecker(path).check_document()
+
+        def headers_footers():
+            # Sections and their header/footer text are read on first use, so
+            # reading them is part of the timed check
+            checker = app.DocumentChecker(path)
+            checker.after_abstract = True
+            checker.check_headers_footers()
+
+        def upload():
+            # Measure a first-time upload, not a cache hit
+            app.result_cache.clear()
+            check_pool.paragraph_cache().clear()
+            with open(path, 'rb') as f:
+                response = client.post('/upload', data={'file': (f, os.path.basename(path))})
+            if response.status_code != 200:
+                raise RuntimeError(f"/upload returned {response.status_code}")
+
+        timings = {}
+        for name in benchmarks:
+            samples = []
+            run = {'structure': structure, 'check_document': check_document,
+                   'headers_footers': headers_footers, 'upload': upload}[name]
+            for i in range(iterations + 1):  # the first run warms up imports and caches
+                start = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - start
+                if i:
+                    samples.append(elapsed)
+            timings[name] = samples
+    return timings, peak_rss_mb()
+
+
+def documents(args, workdir):
+    """(name, path) of every document to benchmark"""
+    from synthetic_docs import generate
+
+    docs = []
+    for pages in args.pages:
+        path = os.path.join(workdir, f'synthetic_{pages}p.docx')
+        generate(path, pages, runs=args.runs, images=args.images, tables=args.tables)
+        docs.append((f'synthetic_{pages}p', path))
+    if not args.no_samples:
+        for path in sorted(glob.glob(os.path.join(ROOT, 'uploads', '*.docx'))):
+            docs.append((os.path.basename(path), path))
+    return docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='*', default=[10, 100], help='synthetic report sizes in pages')
+    parser.add_argument('--runs', type=int, default=6, help='runs per synthetic paragraph')
+    parser.add_argument('--images', type=int, default=1, help='images per synthetic page')
+    parser.add_argument('--tables', type=int, default=1, help='tables per synthetic page')
+    parser.add_argument('--no-samples', action='store_true', help='skip the documents in uploads/')
+    parser.add_argument('--iterations', type=int, default=5, help='timed runs per benchmark')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=BENCHMARKS, help='benchmarks to run')
+    parser.add_argument('--save-baseline', action='store_true', help=f'store p50 latencies in {os.path.relpath(BASELINES)}')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p50 slowdown against the baseline')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINES) and not args.save_baseline:
+        with open(BASELINES) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'document':<40} {'benchmark':<16} {'ops/sec':>9} {'p50 ms':>9} {'p99 ms':>9} {'RSS MB':>7} {'vs base':>8}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, path in documents(args, workdir):
+            # A fresh interpreter per document keeps peak RSS and warm-up separate
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                timings, rss = pool.submit(bench_document, path, args.iterations, args.only).result()
+            for bench, samples in timings.items():
+                key = f'{name}|{bench}'
+                p50 = percentile(samples, 50) * 1000
+                results[key] = round(p50, 3)
+                versus = ''
+                if key in baseline:
+                    ratio = p50 / baseline[key] if baseline[key] else 1.0
+                    versus = f'{ratio:.2f}x'
+                    if ratio > 1 + args.tolerance:
+                        regressions.append(key)
+                        versus += ' !'
+                print(f"{name[:40]:<40} {bench:<16} {1 / statistics.mean(samples):>9.2f} {p50:>9.2f} "
+                      f"{percentile(samples, 99) * 1000:>9.2f} {rss or 0:>7.1f} {versus:>8}")
+
+    if args.save_baseline:
+        with open(BASELINES, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline saved to {os.path.relpath(BASELINES)}")
+    elif regressions:
+        print(f"{len(regressions)} benchmarks slower than baseline by more than {args.tolerance:.0%}: "
+              + ', '.join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Measure cold-start latency of the app: fresh interpreter to first response.
+
+Each run starts a new Python process that imports app and serves one request
+through the Flask test client, either GET / or POST /upload of a sample
+document, and reports the import and first-request times. One extra run per
+request under ``python -X importtime`` lists the slowest imports, split into
+those paid by ``import app`` and those deferred to the first request:
+
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --runs 10 --no-snapshot
+    python benchmarks/cold_start.py --budget-ms 350
+
+With --budget-ms the exit status is 1 when the median ``import app`` time
+exceeds the budget. It is also 1 if importing app loads any of the checking
+engine's dependencies, which are meant to wait for the first check.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUESTS = ['/', '/upload']
+# Modules that importing app must leave for the first check to load
+DEFERRED = ['checker', 'docx', 'lxml', 'yaml', 'multiprocessing']
+
+CHILD = r'''
+import io, json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+loaded = [name for name in sys.argv[3].split(',') if name in sys.modules]
+client = app.app.test_client()
+if sys.argv[1] == '/':
+    response = client.get('/')
+else:
+    with open(sys.argv[2], 'rb') as f:
+        response = client.post('/upload', data={'file': (io.BytesIO(f.read()), 'sample.docx')})
+done = time.perf_counter()
+print(json.dumps({'status': response.status_code, 'loaded': loaded,
+                  'import_ms': (imported - started) * 1000, 'request_ms': (done - imported) * 1000}))
+'''
+
+
+def child_env(no_snapshot):
+    """Keep the app self-contained: in-process checks, no caches or files on disk"""
+    env = dict(os.environ, CHECK_WORKERS='0', RESULT_CACHE_DIR='', RESULT_STORE_DIR='',
+               CHECK_LOG_PATH=':memory:', LOG_LEVEL='WARNING')
+    if no_snapshot:
+        env['TEMPLATE_SNAPSHOT_DIR'] = os.path.join(tempfile.gettempdir(), 'no-template-snapshot')
+    return env
+
+
+def cold_start(path, document, env, importtime=False):
+    """One fresh process serving `path`; returns its timings and `-X importtime` output"""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else [])
+    command += ['-c', CHILD, path, document, ','.join(DEFERRED)]
+    proc = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith('{')]
+    if proc.returncode or not lines:
+        raise RuntimeError(f"Cold start of {path} failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(lines[-1])
+    if result['status'] != 200:
+        raise RuntimeError(f"{path} returned {result['status']}")
+    return result, proc.stderr
+
+
+def parse_importtime(stderr):
+    """(imports done by `import app`, imports deferred to the first request)
+
+    Each is a list of (cumulative ms, self ms, module) for the top-level imports
+    of its phase: app's direct imports, then whatever the request imported.
+    """
+    during, after = [], []
+    phase = during
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        module = name.strip()
+        if phase is during and depth == 0 and module == 'app':
+            phase = after
+        elif (phase is during and depth == 1) or (phase is after and depth == 0):
+            phase.append((int(cumulative) / 1000, int(own) / 1000, module))
+    return sorted(during, reverse=True), sorted(after, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='cold starts per request')
+    parser.add_argument('--document', help='document to upload (default: the first in uploads/)')
+    parser.add_argument('--no-snapshot', action='store_true', help='ignore the precompiled template snapshot')
+    parser.add_argument('--top', type=int, default=8, help='slowest imports to list per phase')
+    parser.add_argument('--budget-ms', type=float, help='fail when the median import of app takes longer')
+    args = parser.parse_args()
+
+    document = args.document or sorted(glob.glob(os.path.join(ROOT, 'uploads', '*.docx')))[0]
+    env = child_env(args.no_snapshot)
+    failures = []
+    print(f"{'request':<8} {'import ms':>10} {'first req ms':>13} {'cold start ms':>14}")
+    imports = {}
+    for path in REQUESTS:
+        runs = [cold_start(path, document, env)[0] for _ in range(args.runs)]
+        import_ms = statistics.median(run['import_ms'] for run in runs)
+        request_ms = statistics.median(run['request_ms'] for run in runs)
+        total_ms = statistics.median(run['import_ms'] + run['request_ms'] for run in runs)
+        print(f"{path:<8} {import_ms:>10.1f} {request_ms:>13.1f} {total_ms:>14.1f}")
+        loaded = sorted({name for run in runs for name in run['loaded']})
+        if loaded:
+            failures.append(f"import app loaded {', '.join(loaded)}")
+        if args.budget_ms is not None and import_ms > args.budget_ms:
+            failures.append(f"import app took {import_ms:.1f} ms before {path}, over the {args.budget_ms:.0f} ms budget")
+        imports[path] = parse_importtime(cold_start(path, document, env, importtime=True)[1])
+
+    during = imports['/'][0]
+    print(f"\nimport app (python -X importtime, {sum(entry[0] for entry in during):.1f} ms in app's imports)")
+    for cumulative, own, module in during[:args.top]:
+        print(f"  {module:<40} {cumulative:>8.1f} ms")
+    for path in REQUESTS:
+        after = imports[path][1]
+        print(f"\ndeferred to the first {path} ({sum(entry[0] for entry in after):.1f} ms)")
+        for cumulative, own, module in after[:args.top]:
+            print(f"  {module:<40} {cumulative:>8.1f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Load benchmark for the /upload check pool.
+
+Submits a burst of document checks through CheckPool for increasing worker
+counts and reports throughput, so scaling with core count can be compared:
+
+    python benchmarks/load_check_pool.py --jobs 64
+    python benchmarks/load_check_pool.py --workers 1 2 4 8 uploads/first_draft.docx
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from check_pool import CheckPool  # noqa: E402
+
+
+def default_worker_counts():
+    counts = []
+    n = 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    counts.append(os.cpu_count() or 1)
+    return counts
+
+
+def run_burst(files, workers, jobs):
+    """Check `jobs` documents on a pool of `workers` and return docs/sec"""
+    pool = CheckPool(workers=workers, queue_size=jobs)
+    try:
+        # Warm the workers up so process start-up is not measured
+        with contextlib.redirect_stdout(io.StringIO()):
+            for future in [pool.submit(files[0]) for _ in range(max(1, workers))]:
+                future.result()
+            start = time.perf_counter()
+            futures = [pool.submit(files[i % len(files)]) for i in range(jobs)]
+            for future in futures:
+                future.result()
+        return jobs / (time.perf_counter() - start)
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*', help='documents to check (default: uploads/*.docx)')
+    parser.add_argument('--jobs', type=int, default=32, help='checks submitted per burst')
+    parser.add_argument('--workers', type=int, nargs='+', default=None, help='worker counts to compare')
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(ROOT, 'uploads', '*.docx')))
+    if not files:
+        parser.error('no documents to check')
+    worker_counts = args.workers or default_worker_counts()
+
+    print(f"{len(files)} documents, {args.jobs} checks per burst, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'docs/sec':>10} {'speedup':>8}")
+    baseline = None
+    for workers in worker_counts:
+        throughput = run_burst(files, workers, args.jobs)
+        baseline = baseline or throughput
+        print(f"{workers:>8} {throughput:>10.2f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
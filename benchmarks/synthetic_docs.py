@@ -0,0 +1,125 @@
+"""Generate synthetic thesis-style .docx reports for benchmarking.
+
+Documents follow the default profile's outline (abstract, chapters and
+numbered sections) with body paragraphs of mixed formatting, so every check
+has work to do. Size and shape are controlled from the command line:
+
+    python benchmarks/synthetic_docs.py --pages 10 100 1000 --out /tmp/docs
+    python benchmarks/synthetic_docs.py --pages 200 --runs 12 --images 2 --tables 1
+"""
+import argparse
+import os
+import struct
+import sys
+import zlib
+from io import BytesIO
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_BREAK
+from docx.shared import Inches, Pt, RGBColor
+
+PARAGRAPHS_PER_PAGE = 12
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+         'incididunt ut labore et dolore magna aliqua').split()
+OUTLINE = [
+    ('CHAPTER 1: INTRODUCTION', ['1.1 GENERAL', '1.2 SCOPE OF THE PROJECT', '1.3 OBJECTIVE']),
+    ('CHAPTER 2: PROJECT DESCRIPTION', ['2.1 GENERAL', '2.2 METHODOLOGIES', '2.2.1 MODULES']),
+    ('CHAPTER 3: REQUIREMENTS ENGINEERING', ['3.1 GENERAL', '3.2 HARDWARE REQUIREMENTS']),
+    ('CHAPTER 4: SYSTEM DESIGN', ['4.1 GENERAL', '4.2 SYSTEM ARCHITECTURE', '4.3 UML']),
+    ('CHAPTER 5: IMPLEMENTATION', ['5.1 GENERAL', '5.2 IMPLEMENTATION']),
+]
+
+
+def png_bytes(width=64, height=48):
+    """A small solid-grey PNG, built without an imaging library"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+    raw = b''.join(b'\x00' + b'\x80' * width for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw))
+            + chunk(b'IEND', b''))
+
+
+def sentence(seed, words=12):
+    return ' '.join(WORDS[(seed + i) % len(WORDS)] for i in range(words))
+
+
+def body_paragraph(document, seed, runs):
+    """A paragraph of `runs` runs with a spread of font, size, colour and alignment"""
+    paragraph = document.add_paragraph()
+    paragraph.alignment = [WD_ALIGN_PARAGRAPH.JUSTIFY, WD_ALIGN_PARAGRAPH.JUSTIFY,
+                           WD_ALIGN_PARAGRAPH.CENTER, None][seed % 4]
+    for k in range(runs):
+        run = paragraph.add_run(sentence(seed + k, 6) + ' ')
+        if (seed + k) % 5 == 1:
+            run.font.name = 'Arial'
+        if (seed + k) % 7 == 2:
+            run.font.size = Pt(11)
+        if (seed + k) % 11 == 3:
+            run.font.color.rgb = RGBColor(0xC0, 0, 0)
+        if (seed + k) % 13 == 4:
+            run.bold = True
+    return paragraph
+
+
+def generate(path, pages=10, runs=6, images=0, tables=0, page_breaks=True):
+    """Write a report of roughly `pages` pages to `path`
+
+    `images` and `tables` are added per page; with `page_breaks` every page
+    ends in an explicit break, otherwise pagination is left to Word.
+    """
+    document = Document()
+    section = document.sections[0]
+    section.left_margin = section.right_margin = Inches(1.75)
+    section.header.paragraphs[0].text = 'Project Title'
+    section.footer.paragraphs[0].text = 'Dept. name    Page'
+    image = png_bytes()
+
+    document.add_paragraph('ABSTRACT', style='Heading 1')
+    headings = []
+    for chapter, sections in OUTLINE:
+        headings.append(('Heading 1', chapter))
+        headings.extend(('Heading 2', title) for title in sections)
+    heading_every = max(1, pages // max(1, len(headings)))
+
+    for page in range(pages):
+        if page % heading_every == 0 and page // heading_every < len(headings):
+            style, text = headings[page // heading_every]
+            document.add_paragraph(text, style=style)
+        for i in range(PARAGRAPHS_PER_PAGE):
+            body_paragraph(document, page * PARAGRAPHS_PER_PAGE + i, runs)
+        for _ in range(images):
+            picture = document.add_paragraph()
+            picture.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            picture.add_run().add_picture(BytesIO(image), width=Inches(7 if page % 3 == 0 else 4))
+        for _ in range(tables):
+            table = document.add_table(rows=3, cols=3)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = sentence(page + r + c, 3)
+        if page_breaks and page < pages - 1:
+            document.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+    document.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 100], help='page counts to generate')
+    parser.add_argument('--runs', type=int, default=6, help='runs per body paragraph')
+    parser.add_argument('--images', type=int, default=0, help='images per page')
+    parser.add_argument('--tables', type=int, default=0, help='tables per page')
+    parser.add_argument('--no-page-breaks', action='store_true', help='leave pagination to Word')
+    parser.add_argument('--out', default='.', help='output directory')
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for pages in args.pages:
+        path = os.path.join(args.out, f'synthetic_{pages}p.docx')
+        generate(path, pages, args.runs, args.images, args.tables, not args.no_page_breaks)
+        print(f"{path} ({os.path.getsize(path) / 1024:.0f} KB)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""Check a batch of .docx files in parallel from the command line.
+
+Takes files, directories (searched recursively) and glob patterns, checks them
+on a process pool and appends one record per document to a JSONL or CSV file:
+
+    python check_batch.py uploads/ --output results.jsonl
+    python check_batch.py "submissions/**/*.docx" --output cohort.csv --workers 8
+
+Records are flushed as each document finishes. Re-running with the same
+output skips documents already recorded with the same content and profile,
+so an interrupted batch picks up where it stopped.
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from check_pool import run_check
+from config import config
+from issue_codes import render_issue
+from preflight import preflight
+from profiles import DEFAULT_PROFILE, configured_profiles
+
+CSV_FIELDS = ['path', 'sha256', 'profile', 'status', 'total_issues', 'lines_with_issues',
+              'total_lines', 'page_count', 'seconds', 'error']
+
+
+def find_documents(inputs):
+    """Expand files, directories and glob patterns into a sorted list of .docx paths"""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, '**', '*.docx'), recursive=True)
+        elif os.path.isfile(item):
+            matches = [item]
+        else:
+            matches = glob.glob(item, recursive=True)
+        for path in matches:
+            name = os.path.basename(path)
+            if path.lower().endswith('.docx') and not name.startswith('~$'):  # skip Word lock files
+                paths.add(os.path.abspath(path))
+    return sorted(paths)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def output_format(path, requested=None):
+    if requested:
+        return requested
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def completed_records(path, fmt):
+    """(path, sha256, profile) of documents already recorded in an existing output file"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            rows = csv.DictReader(f)
+        else:
+            rows = []
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue  # a line cut short by a crash; that file is checked again
+        for row in rows:
+            if row.get('status') == 'ok':
+                done.add((row.get('path'), row.get('sha256'), row.get('profile')))
+    return done
+
+
+def check_file(path, sha256, profile, cpu_seconds, rules=None):
+    """Check one document in a worker process and return its output record"""
+    started = time.perf_counter()
+    record = {'path': path, 'sha256': sha256, 'profile': profile}
+    try:
+        preflight(path)  # broken, encrypted and zip-bomb files never reach the checker
+        result = run_check(path, cpu_seconds, profile=profile, rules=rules)
+    except Exception as e:
+        record.update(status='error', error=f'{type(e).__name__}: {e}')
+    else:
+        summary = result.get('summary', {})
+        record.update(
+            status='ok',
+            total_issues=summary.get('total_issues', len(result.get('issues', []))),
+            lines_with_issues=summary.get('lines_with_issues', 0),
+            total_lines=summary.get('total_lines', 0),
+            page_count=summary.get('page_count', 0),
+            issues=[issue if isinstance(issue, str) else issue.get('message', str(issue))
+                    for issue in map(render_issue, result.get('issues', []))],
+        )
+    record['seconds'] = round(time.perf_counter() - started, 3)
+    return record
+
+
+class RecordWriter:
+    """Appends records to a JSONL or CSV file, flushing each one"""
+
+    def __init__(self, path, fmt):
+        self.fmt = fmt
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        if fmt == 'csv':
+            self._csv = csv.DictWriter(self._file, fieldnames=CSV_FIELDS, extrasaction='ignore')
+            if new_file:
+                self._csv.writeheader()
+
+    def write(self, record):
+        if self.fmt == 'csv':
+            self._csv.writerow(record)
+        else:
+            self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('inputs', nargs='+', help='.docx files, directories or glob patterns')
+    parser.add_argument('--output', '-o', default='results.jsonl', help='JSONL or CSV file to append records to')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='output format (default: from the file extension)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE, help='rule profile name')
+    parser.add_argument('--cpu-seconds', type=float, default=None, help='CPU time budget per document')
+    parser.add_argument('--no-resume', action='store_true', help='check every document even if already recorded')
+    args = parser.parse_args(argv)
+    # Keep the terminal for progress lines; workers log warnings and errors only
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    profiles = configured_profiles()
+    if args.profile not in profiles:
+        parser.error(f"unknown profile '{args.profile}' (available: {', '.join(sorted(profiles))})")
+    rules = config.rule_overrides()  # the admin settings in config.json apply as they do to uploads
+    fmt = output_format(args.output, args.format)
+    documents = find_documents(args.inputs)
+    if not documents:
+        parser.error('no .docx files found')
+
+    done = set() if args.no_resume else completed_records(args.output, fmt)
+    pending = []
+    for path in documents:
+        sha256 = file_digest(path)
+        if (path, sha256, args.profile) not in done:
+            pending.append((path, sha256))
+    skipped = len(documents) - len(pending)
+    print(f"{len(documents)} documents, {skipped} already checked, {len(pending)} to check "
+          f"on {args.workers} workers", file=sys.stderr)
+
+    writer = RecordWriter(args.output, fmt)
+    failures = 0
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            futures = {pool.submit(check_file, path, sha256, args.profile, args.cpu_seconds, rules): path
+                       for path, sha256 in pending}
+            for count, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                writer.write(record)
+                if record['status'] == 'ok':
+                    outcome = f"{record['total_issues']} issues"
+                else:
+                    failures += 1
+                    outcome = f"ERROR {record['error']}"
+                print(f"[{count}/{len(pending)}] {os.path.relpath(record['path'])}: {outcome} "
+                      f"({record['seconds']:.2f}s)", file=sys.stderr)
+    except BrokenProcessPool:
+        print("A worker process died; re-run the same command to resume", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("Interrupted; re-run the same command to resume", file=sys.stderr)
+        return 130
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    rate = len(pending) / elapsed if elapsed > 0 else 0.0
+    print(f"Checked {len(pending)} documents in {elapsed:.1f}s ({rate:.2f} docs/sec), "
+          f"{failures} failed; results in {args.output}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+
+log = logging.getLogger(__name__)
+
+DEFAULT_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'check_log.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    issues_found INTEGER NOT NULL,
+    user_ip TEXT,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS checks_timestamp ON checks (timestamp);
+CREATE INDEX IF NOT EXISTS checks_filename ON checks (filename);
+CREATE INDEX IF NOT EXISTS checks_issues_found ON checks (issues_found);
+"""
+
+
+class CheckLog:
+    """Append-only log of document checks in SQLite
+
+    The database runs in WAL mode, so an append is a single small write that
+    does not block readers or other worker processes, and history is kept
+    until `retention_days` (if set) expires it. Where the file cannot be
+    opened (read-only deployments) the log is kept in memory instead.
+    """
+
+    PRUNE_EVERY = 100  # appends between retention sweeps
+
+    def __init__(self, path, retention_days=None):
+        self.path = path
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._appends = 0
+        try:
+            self._db = self._connect(path)
+        except (sqlite3.Error, OSError) as e:
+            log.warning("Could not open check log %s, keeping it in memory: %s", path, e)
+            self.path = ':memory:'
+            self._db = self._connect(':memory:')
+        self.prune()
+
+    @staticmethod
+    def _connect(path):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        db.row_factory = sqlite3.Row
+        if path != ':memory:':
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+        db.executescript(SCHEMA)
+        return db
+
+    @staticmethod
+    def _row(row):
+        check = dict(row)
+        check['metadata'] = json.loads(check['metadata'] or '{}')
+        return check
+
+    def append(self, filename, issues_found, user_ip, metadata=None, timestamp=None):
+        """Record one document check and return its id"""
+        with self._lock:
+            cursor = self._db.execute(
+                'INSERT INTO checks (timestamp, filename, issues_found, user_ip, metadata) VALUES (?, ?, ?, ?, ?)',
+                (timestamp or datetime.now().isoformat(), filename, int(issues_found), user_ip,
+                 json.dumps(metadata or {}, default=str)))
+            self._appends += 1
+            prune = self.retention_days and self._appends % self.PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+        return cursor.lastrowid
+
+    def extend(self, checks):
+        """Import checks in the legacy config.json format, oldest first"""
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.executemany(
+                    'INSERT INTO checks (timestamp, filename, issues_found, user_ip, metadata) VALUES (?, ?, ?, ?, ?)',
+                    [(c.get('timestamp') or datetime.now().isoformat(), c.get('filename', ''),
+                      int(c.get('issues_found', 0)), c.get('user_ip'),
+                      json.dumps(c.get('metadata') or {}, default=str)) for c in checks])
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    @staticmethod
+    def _where(start=None, end=None, filename=None, min_issues=None, max_issues=None):
+        """SQL filter clause and parameters; `end` is exclusive"""
+        clauses, params = [], []
+        if start:
+            clauses.append('timestamp >= ?')
+            params.append(start)
+        if end:
+            clauses.append('timestamp < ?')
+            params.append(end)
+        if filename:
+            clauses.append("filename LIKE ? ESCAPE '\\'")
+            escaped = filename.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f'%{escaped}%')
+        if min_issues is not None:
+            clauses.append('issues_found >= ?')
+            params.append(min_issues)
+        if max_issues is not None:
+            clauses.append('issues_found <= ?')
+            params.append(max_issues)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def query(self, limit=100, offset=0, **filters):
+        """Checks matching `filters`, newest first"""
+        where, params = self._where(**filters)
+        with self._lock:
+            rows = self._db.execute(
+                f'SELECT * FROM checks{where} ORDER BY id DESC LIMIT ? OFFSET ?',
+                params + [limit, offset]).fetchall()
+        return [self._row(row) for row in rows]
+
+    def iter(self, batch_size=500, **filters):
+        """Yield every check matching `filters`, oldest first, a batch at a time"""
+        where, params = self._where(**filters)
+        last_id = 0
+        while True:
+            keyset = f"{where} AND id > ?" if where else ' WHERE id > ?'
+            with self._lock:
+                rows = self._db.execute(
+                    f'SELECT * FROM checks{keyset} ORDER BY id LIMIT ?',
+                    params + [last_id, batch_size]).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._row(row)
+            last_id = rows[-1]['id']
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        with self._lock:
+            return self._db.execute(f'SELECT COUNT(*) FROM checks{where}', params).fetchone()[0]
+
+    def delete(self, check_id):
+        """Delete one check; returns False if there was no such check"""
+        with self._lock:
+            return self._db.execute('DELETE FROM checks WHERE id = ?', (check_id,)).rowcount > 0
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM checks')
+
+    def prune(self):
+        """Drop checks older than the retention period"""
+        if not self.retention_days:
+            return 0
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        with self._lock:
+            return self._db.execute('DELETE FROM checks WHERE timestamp < ?', (cutoff,)).rowcount
+
+
+def main(argv=None):
+    """Move the check history earlier versions kept in config.json into the check log
+
+    A one-off step for deployments upgraded from those versions:
+
+        python check_log.py
+        python check_log.py path/to/config.json --log /var/lib/checker/check_log.sqlite3
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__.splitlines()[0])
+    parser.add_argument('config', nargs='?', default='config.json', help='config file holding the legacy history')
+    parser.add_argument('--log', default=os.environ.get('CHECK_LOG_PATH', DEFAULT_LOG_PATH),
+                        help='check log database (default: CHECK_LOG_PATH or check_log.sqlite3)')
+    args = parser.parse_args(argv)
+
+    from config import Config
+    config = Config.load(args.config)
+    checks = config.document_checks
+    if not checks:
+        print(f"No check history in {args.config}", file=sys.stderr)
+        return 0
+    check_log = CheckLog(args.log)
+    if check_log.path == ':memory:':
+        parser.error(f"could not open check log {args.log}")
+    check_log.extend(checks)
+    config.document_checks = []
+    config.save(args.config)
+    if Config.load(args.config).document_checks:
+        print(f"Moved {len(checks)} checks into {check_log.path}, but could not rewrite {args.config}; "
+              f"remove its document_checks before running this again", file=sys.stderr)
+        return 1
+    print(f"Moved {len(checks)} checks from {args.config} into {check_log.path}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
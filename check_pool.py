@@ -0,0 +1,321 @@
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import BrokenExecutor, CancelledError, Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import logging_setup
+
+try:
+    import resource
+    import signal
+except ImportError:  # Windows has no rlimits; only the wall-clock budget applies
+    resource = None
+    signal = None
+
+log = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when every worker is busy and the waiting queue is full"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Check queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class CheckTimeout(Exception):
+    """Raised when a check exceeds its CPU or wall-clock budget"""
+
+
+def _cpu_budget_exceeded(signum, frame):
+    raise CheckTimeout("Document check exceeded its CPU time budget")
+
+
+@contextmanager
+def cpu_budget(seconds):
+    """Raise CheckTimeout once this process has used `seconds` more CPU time
+
+    RLIMIT_CPU counts the whole process lifetime, so the budget is set relative
+    to what a long-lived worker has already used. Without rlimits (Windows) or a
+    budget this does nothing; it must be entered from the main thread.
+    """
+    if not seconds or resource is None:
+        yield
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    limit = int(math.ceil(used + seconds))
+    if hard != resource.RLIM_INFINITY and limit > hard:
+        yield
+        return
+    signal.signal(signal.SIGXCPU, _cpu_budget_exceeded)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _picklable(source):
+    """A document source that can be sent to a worker process: a path or bytes"""
+    if isinstance(source, (str, os.PathLike, bytes)):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    source.seek(0)
+    return source.read()
+
+
+_paragraph_cache = None
+_shard_pool = None
+
+
+def paragraph_cache():
+    """Findings for unchanged paragraphs, kept per worker process (PARAGRAPH_CACHE_ENTRIES)"""
+    global _paragraph_cache
+    if _paragraph_cache is None:
+        from result_cache import LRUCache
+        _paragraph_cache = LRUCache(int(os.environ.get('PARAGRAPH_CACHE_ENTRIES', 50000)))
+    return _paragraph_cache
+
+
+def shard_pool():
+    """This worker's ShardPool, created on its first check
+
+    Documents whose main part is at least CHECK_SHARD_MIN_MB are split into
+    shards checked on CHECK_SHARD_WORKERS extra processes (0 = check every
+    document in one pass), each with the CHECK_CPU_SECONDS budget.
+    """
+    global _shard_pool
+    if _shard_pool is None:
+        from sharding import ShardPool
+        _shard_pool = ShardPool(
+            workers=int(os.environ.get('CHECK_SHARD_WORKERS', 0)),
+            min_document_mb=float(os.environ.get('CHECK_SHARD_MIN_MB', 4)),
+            cpu_seconds=float(os.environ.get('CHECK_CPU_SECONDS', 60))
+        )
+    return _shard_pool
+
+
+def run_check(source, cpu_seconds=None, progress=None, profile=None, timings=False, request_id=None, rules=None):
+    """Run DocumentChecker on a document; executed inside a pool worker process
+    
+    `source` is a path, bytes or, on the thread fallback, a seekable file.
+    `profile` names a rule profile, compiled once per worker from RULE_PROFILES_DIR,
+    and `rules` replaces some of its rules, e.g. with the admin settings.
+    With `timings`, the result carries a per-rule timing breakdown under 'timings'.
+    `request_id` tags this check's log records with the request that submitted it.
+    """
+    from checker import DocumentChecker
+    from check_timing import CheckTimings
+    from profiles import DEFAULT_PROFILE, resolve_profile
+
+    logging_setup.ensure_logging()
+    token = logging_setup.request_id.set(request_id or logging_setup.request_id.get())
+    started = time.perf_counter()
+
+    try:
+        with cpu_budget(cpu_seconds):
+            check_timings = CheckTimings() if timings else None
+            checker = DocumentChecker(source, paragraph_cache(), resolve_profile(profile or DEFAULT_PROFILE, rules),
+                                      check_timings, shard_pool())
+            if check_timings is None:
+                return checker.check_document(progress)
+            with check_timings.phase('total'):
+                result = checker.check_document(progress)
+            result['timings'] = check_timings.to_dict()
+            return result
+    finally:
+        name = os.path.basename(source) if isinstance(source, (str, os.PathLike)) else 'uploaded document'
+        log.info("Check of %s finished in %.3fs", name, time.perf_counter() - started)
+        logging_setup.request_id.reset(token)
+
+
+class CheckPool:
+    """Run document checks on a process pool with a bounded queue
+
+    At most ``workers + queue_size`` checks are admitted at once; further
+    submissions raise QueueFull carrying a Retry-After estimate instead of
+    piling up behind large documents. With ``workers=0``, or where a process
+    pool cannot be created (e.g. serverless sandboxes without /dev/shm),
+    checks run one at a time on a background thread of the web process.
+    """
+
+    def __init__(self, workers=None, queue_size=8, cpu_seconds=None, timeout=None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.queue_size = queue_size
+        self.cpu_seconds = cpu_seconds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(1, self.workers) + queue_size)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._manager = None
+        self.uses_processes = False
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.avg_seconds = 1.0  # moving average of job duration, for Retry-After
+
+    def _get_executor(self):
+        """Create the process pool on first use, falling back to a thread"""
+        with self._lock:
+            if self._executor is None and self.workers > 0:
+                try:
+                    # Imported here so thread-only deployments never load multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    self.uses_processes = True
+                except (OSError, NotImplementedError, ImportError) as e:
+                    log.warning("Process pool unavailable, checking in a thread: %s", e)
+                    self.workers = 0
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='check')
+                self.uses_processes = False
+            return self._executor
+
+    def _progress_queue(self):
+        """A queue pool workers can report progress through"""
+        with self._lock:
+            if self._manager is None:
+                import multiprocessing
+                self._manager = multiprocessing.Manager()
+            return self._manager.Queue()
+
+    def _discard(self, executor):
+        """Forget a broken `executor` so the next submit starts a fresh pool"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _watch(self, executor, future):
+        """Discard `executor` if `future` fails because a worker died (e.g. killed by the OS)"""
+        def done(f):
+            if not f.cancelled() and isinstance(f.exception(), BrokenExecutor):
+                self._discard(executor)
+        future.add_done_callback(done)
+        return future
+
+    def _relay(self, events, inner, outer, progress):
+        """Forward worker progress events, then settle `outer` once all are delivered"""
+        while True:
+            try:
+                event = events.get(timeout=0.05)
+            except queue.Empty:
+                if inner.done():
+                    break
+                continue
+            except (EOFError, OSError):
+                break
+            progress(event)
+        # The worker has returned; whatever it reported is already queued
+        while True:
+            try:
+                progress(events.get_nowait())
+            except (queue.Empty, EOFError, OSError):
+                break
+        if inner.cancelled():
+            outer.set_exception(CancelledError())
+        elif inner.exception() is not None:
+            outer.set_exception(inner.exception())
+        else:
+            outer.set_result(inner.result())
+
+    def retry_after(self):
+        """Seconds until a queue slot is likely to free up"""
+        return max(1, int(math.ceil(self.avg_seconds * max(1, self.pending) / max(1, self.workers))))
+
+    def _job_done(self, started):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+            self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * (time.monotonic() - started)
+        self._slots.release()
+
+    def submit(self, source, progress=None, profile=None, timings=False, rules=None) -> Future:
+        """Queue a check, raising QueueFull when the queue has no free slot
+
+        `source` is a path, bytes or a seekable binary file; files are read
+        into bytes only when they have to be sent to a worker process.
+
+        `progress` is called in this process with each page event the checker
+        reports; the returned future resolves after the last one is delivered.
+        `rules` replaces some of the profile's rules (see run_check).
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise QueueFull(self.retry_after())
+        with self._lock:
+            self.pending += 1
+        started = time.monotonic()
+        request_id = logging_setup.request_id.get()
+
+        try:
+            try:
+                future = self._submit(source, progress, profile, timings, rules, request_id)
+            except BrokenExecutor as e:
+                # A worker died since the last check; retry once on a fresh pool
+                log.warning("Check pool broken, restarting it: %s", e)
+                future = self._submit(source, progress, profile, timings, rules, request_id)
+        except BaseException:
+            self._job_done(started)
+            raise
+        future.add_done_callback(lambda _: self._job_done(started))
+        return future
+
+    def _submit(self, source, progress, profile, timings, rules, request_id) -> Future:
+        executor = self._get_executor()
+        try:
+            if not self.uses_processes:
+                # The SIGXCPU handler can only be installed in a main thread, so
+                # thread checks get the wall-clock budget only
+                future = self._watch(executor, executor.submit(
+                    run_check, source, None, progress, profile, timings, request_id, rules))
+            elif progress is None:
+                future = self._watch(executor, executor.submit(
+                    run_check, _picklable(source), self.cpu_seconds, None, profile, timings, request_id, rules))
+            else:
+                events = self._progress_queue()
+                inner = self._watch(executor, executor.submit(
+                    run_check, _picklable(source), self.cpu_seconds, events.put, profile, timings, request_id, rules))
+                future = Future()
+                future.set_running_or_notify_cancel()
+                threading.Thread(target=self._relay, args=(events, inner, future, progress), daemon=True).start()
+        except BrokenExecutor:
+            self._discard(executor)
+            raise
+        return future
+
+    def check(self, source, profile=None, timings=False, rules=None):
+        """Check a document through the pool and wait for its result"""
+        future = self.submit(source, profile=profile, timings=timings, rules=rules)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise CheckTimeout("Document check exceeded its time budget")
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'pending': self.pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'avg_seconds': round(self.avg_seconds, 3),
+        }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Histogram buckets are powers of two of microseconds, up to ~18 minutes
+BUCKETS = 30
+
+
+class CheckTimings:
+    """Call counts and cumulative nanoseconds per rule check and phase
+
+    Only created when timing is requested; the checker wraps its methods on the
+    instance, so unprofiled checks run the plain methods at no extra cost.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.ns = {}
+
+    def add(self, name, elapsed_ns):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.ns[name] = self.ns.get(name, 0) + elapsed_ns
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter_ns() - start)
+
+    def wrap(self, name, func):
+        """`func` with every call timed under `name`"""
+        @wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter_ns() - start)
+        return timed
+
+    def iterate(self, name, iterator):
+        """Yield from `iterator`, timing the work done to produce each item"""
+        iterator = iter(iterator)
+        while True:
+            start = time.perf_counter_ns()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter_ns() - start)
+                return
+            self.add(name, time.perf_counter_ns() - start)
+            yield item
+
+    def to_dict(self):
+        """{name: {'calls', 'ms'}}, slowest first"""
+        return {
+            name: {'calls': self.calls[name], 'ms': round(self.ns[name] / 1e6, 3)}
+            for name in sorted(self.ns, key=self.ns.get, reverse=True)
+        }
+
+
+def _bucket(ms):
+    micros = max(1, int(ms * 1000))
+    return min(BUCKETS - 1, micros.bit_length() - 1)
+
+
+class TimingHistograms:
+    """Rolling per-rule histograms of time spent per document check
+
+    Keeps the last `window` checks; each rule's milliseconds for a check fall
+    into power-of-two buckets, and percentiles are read from the buckets.
+    """
+
+    def __init__(self, window=500):
+        self.window = window
+        self._samples = deque()
+        self._buckets = {}  # name -> [count per bucket]
+        self._totals = {}  # name -> [checks, calls, ms]
+        self._lock = threading.Lock()
+
+    def _apply(self, timings, sign):
+        for name, entry in timings.items():
+            buckets = self._buckets.setdefault(name, [0] * BUCKETS)
+            buckets[_bucket(entry['ms'])] += sign
+            totals = self._totals.setdefault(name, [0, 0, 0.0])
+            totals[0] += sign
+            totals[1] += sign * entry['calls']
+            totals[2] += sign * entry['ms']
+
+    def record(self, timings):
+        """Add one check's CheckTimings.to_dict()"""
+        with self._lock:
+            self._samples.append(timings)
+            self._apply(timings, 1)
+            if len(self._samples) > self.window:
+                self._apply(self._samples.popleft(), -1)
+
+    @staticmethod
+    def _percentile(buckets, count, pct):
+        rank = pct / 100 * count
+        seen = 0
+        for index, bucket_count in enumerate(buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return (1 << (index + 1)) / 1000  # bucket upper bound in ms
+        return 0.0
+
+    def stats(self):
+        """Per-rule summary for the dashboard, most expensive first"""
+        with self._lock:
+            rows = []
+            for name, (checks, calls, ms) in self._totals.items():
+                if checks <= 0:
+                    continue
+                buckets = self._buckets[name]
+                rows.append({
+                    'name': name,
+                    'checks': checks,
+                    'calls_per_check': round(calls / checks, 1),
+                    'mean_ms': round(ms / checks, 3),
+                    'p50_ms': self._percentile(buckets, checks, 50),
+                    'p95_ms': self._percentile(buckets, checks, 95),
+                    'histogram': list(buckets),
+                })
+        rows.sort(key=lambda row: row['mean_ms'], reverse=True)
+        return {'checks': len(self._samples), 'window': self.window, 'rules': rows}
@@ -0,0 +1,723 @@
+import logging
+from contextlib import nullcontext
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+from docx_stream import DocxStream, EMU_PER_INCH, EMU_PER_POINT, lean_package
+from issue_codes import Issue, IssueCode, RangeTracker
+from profiles import DEFAULT_PROFILE, configured_profiles
+
+log = logging.getLogger(__name__)
+
+# Map raw w:jc values from the document stream onto python-docx alignment members
+JC_ALIGNMENT = {member.xml_value: member for member in WD_ALIGN_PARAGRAPH}
+JC_ALIGNMENT.update({'start': WD_ALIGN_PARAGRAPH.LEFT, 'end': WD_ALIGN_PARAGRAPH.RIGHT})
+
+
+class DocumentChecker:
+    # Rule checks and passes whose calls are timed when timings are requested
+    TIMED_METHODS = (
+        'check_font', 'check_font_size', 'check_alignment', 'check_spacing', 'check_image_alignment',
+        'check_text_color', 'paragraph_findings', 'track_heading', 'update_page_break',
+        'update_section_tracking', 'check_margins', 'check_page_numbering',
+        'check_headers_footers', 'structure_results'
+    )
+    
+    def check_font(self, run):
+        """Check if font is Times New Roman"""
+        if run.font_name and run.font_name != self.rules['font_name']:
+            return [Issue(IssueCode.FONT, (self.rules['font_name'], run.font_name))]
+        return []
+    
+    def expected_font_size(self, style_name):
+        """Return (expected size, lowercased style name) for a paragraph style"""
+        try:
+            return self.expected_sizes[style_name]
+        except KeyError:
+            pass
+            
+        expected_size = self.rules['normal_text_size']  # Default to normal size
+        
+        # Determine expected size based on style
+        style_lower = style_name.lower()
+        if 'heading' in style_lower:
+            if '1' in style_lower:
+                expected_size = self.rules['heading1_size']
+            elif '2' in style_lower:
+                expected_size = self.rules['heading2_size']
+        
+        self.expected_sizes[style_name] = (expected_size, style_lower)
+        return expected_size, style_lower
+    
+    def check_font_size(self, para, run):
+        """Check if font size matches the style"""
+        if not run.size_half_points or not run.text.strip():
+            return []
+            
+        size_pt = run.size_pt
+        expected_size, style_name = self.expected_font_size(para.style_name)
+        
+        if abs(size_pt - expected_size) > 0.1:  # Allow for small rounding differences
+            return [Issue(IssueCode.FONT_SIZE, (expected_size, style_name, size_pt))]
+        return []
+    
+    def check_alignment(self, para):
+        """Check if paragraph alignment is correct"""
+        # Skip if no alignment set (default is left) or empty paragraph
+        alignment = JC_ALIGNMENT.get(para.alignment)
+        if not alignment or not para.text.strip():
+            return []
+            
+        # Get the text for context
+        text = para.text.lower().strip()
+        
+        # Default expected alignment is JUSTIFY for normal text
+        expected_alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+        
+        # Check for exceptions (headings, titles, etc.)
+        if any(keyword in text for keyword in ['title', 'chapter', 'abstract', 'acknowledgment', 'appendix', 'reference']):
+            expected_alignment = WD_ALIGN_PARAGRAPH.CENTER
+        
+        if alignment != expected_alignment:
+            alignment_names = {
+                WD_ALIGN_PARAGRAPH.LEFT: 'left',
+                WD_ALIGN_PARAGRAPH.CENTER: 'center',
+                WD_ALIGN_PARAGRAPH.RIGHT: 'right',
+                WD_ALIGN_PARAGRAPH.JUSTIFY: 'justify'
+            }
+            return [Issue(IssueCode.ALIGNMENT, (alignment_names.get(expected_alignment, 'justify'), alignment_names.get(alignment, 'unknown')))]
+        return []
+    
+    def check_spacing(self, para):
+        """Check line spacing and the spacing before and after a paragraph
+        
+        Spacing is resolved through the style chain by the document stream, so
+        the findings only depend on these four values and are worked out once
+        per distinct combination.
+        """
+        if not para.text.strip():
+            return []
+        key = (para.line_spacing, para.line_rule, para.space_before, para.space_after)
+        try:
+            return self.spacing_findings[key]
+        except KeyError:
+            pass
+        
+        findings = []
+        required = self.rules['required_line_spacing']
+        if para.line_rule == 'auto':
+            found = para.line_spacing / 240
+            if abs(found - required) > 0.01:
+                findings.append(Issue(IssueCode.LINE_SPACING, (required, round(found, 2))))
+        else:
+            kind = 'exactly' if para.line_rule == 'exact' else 'at least'
+            findings.append(Issue(IssueCode.FIXED_LINE_SPACING, (required, kind, para.line_spacing / 20)))
+        for side, emus in (('before', para.space_before), ('after', para.space_after)):
+            limit = self.rules.get(f'max_space_{side}')
+            if limit is not None and emus is not None and emus / EMU_PER_POINT > limit + 0.01:
+                findings.append(Issue(IssueCode.PARAGRAPH_SPACING, (side, limit, round(emus / EMU_PER_POINT, 1))))
+        self.spacing_findings[key] = findings
+        return findings
+    
+    def check_margins(self):
+        try:
+            sections = self.sections
+            for section in sections:
+                if section.left_margin is None or section.right_margin is None:
+                    self.issues.append("Could not verify margin sizes. Please check margins manually.")
+                    log.debug("Section has no page margins to check")
+                    break
+                left_margin = section.left_margin / EMU_PER_INCH
+                right_margin = section.right_margin / EMU_PER_INCH
+                if left_margin < self.rules['margin_min'] or right_margin < self.rules['margin_min']:
+                    self.issues.append(f"Margins should be at least {self.rules['margin_min']} inches on both sides")
+                    break
+        except Exception:
+            log.exception("Error in margin checking")
+            self.issues.append("Error checking document margins.")
+    
+    def add_issue(self, message, line_num=None, line_text=''):
+        """Add an issue with line number and context"""
+        if line_num is not None:
+            # Convert line_num to int if it's a string that can be converted to float
+            try:
+                if isinstance(line_num, str):
+                    line_num = int(round(float(line_num)))
+                elif isinstance(line_num, float):
+                    line_num = int(round(line_num))
+                elif not isinstance(line_num, int):
+                    # If it's not a string, float, or int, use 0 as fallback
+                    line_num = 0
+            except (ValueError, TypeError):
+                line_num = 0
+                
+            self.line_issues.append({
+                'line': line_num,
+                'text': str(line_text)[:100] + ('...' if len(str(line_text)) > 100 else ''),
+                'issue': str(message)
+            })
+        self.issues.append(str(message))
+    
+    def update_section_tracking(self, text):
+        """Update section tracking based on text content"""
+        text_lower = text.lower()
+        
+        # Check for abstract section
+        if 'abstract' in text_lower and not self.after_abstract:
+            self.in_abstract = True
+            self.current_section = 'abstract'
+        # Check for references section
+        elif any(keyword in text_lower for keyword in ['references', 'bibliography']) and not self.in_references:
+            self.in_references = True
+            self.after_abstract = True
+            self.current_section = 'references'
+        # If we were in abstract and now we're not, mark after_abstract as True
+        elif self.in_abstract and not self.after_abstract and text.strip():
+            self.in_abstract = False
+            self.after_abstract = True
+            self.current_section = 'main_content'
+            
+    def check_image_alignment(self, para):
+        """Check if images are center aligned"""
+        issues = []
+        
+        # Check if paragraph contains an image
+        for run in para.runs:
+            if run.has_image:  # Check for images in the run
+                # Check paragraph alignment
+                if JC_ALIGNMENT.get(para.alignment) != WD_ALIGN_PARAGRAPH.CENTER:
+                    issues.append(Issue(IssueCode.IMAGE_ALIGNMENT))
+                # Check if image is too large (wider than 6 inches)
+                for extent in run.image_widths:
+                    width = extent / EMU_PER_INCH  # Convert EMUs to inches
+                    if width > 6:  # If image is wider than 6 inches
+                        issues.append(Issue(IssueCode.IMAGE_WIDTH, (round(width, 1),)))
+                break  # Only need to check once per paragraph
+        
+        return issues
+        
+    def __init__(self, source, paragraph_cache=None, profile=None, timings=None, shards=None):
+        self.source = source  # path, seekable binary file or bytes of the .docx
+        self.profile = profile or configured_profiles()[DEFAULT_PROFILE]
+        self.paragraph_cache = paragraph_cache  # (profile hash, paragraph key) -> (record, findings, has_image_issue)
+        self.shards = shards  # ShardPool checking large documents on several processes, or None
+        self._doc = None
+        self._sections = None
+        self.timings = timings  # CheckTimings, or None to run the checks unwrapped
+        if timings is not None:
+            for name in self.TIMED_METHODS:
+                setattr(self, name, timings.wrap(name, getattr(self, name)))
+        self.issues = []
+        self.line_issues = []
+        self.current_section = None
+        self.in_abstract = False
+        self.in_references = False
+        self.after_abstract = False
+        self.total_lines = 0
+        self.lines_with_issues = 0
+        self.sections_checked = 0
+        self.current_paragraph = None
+        self.rules = dict(self.profile.rules, pages=[])
+        
+        self.expected_structure = self.profile.outline
+        self.headings_index = self.profile.headings
+        
+        # Track found sections for validation
+        self.found_sections = {chapter: {} for chapter in self.expected_structure}
+        self.current_chapter = None
+        self.missing_sections = []
+        self.extra_sections = []
+        self.structure_issues = []
+        self.paragraph_pages = []  # Page each body paragraph ends on
+        self.expected_sizes = {}  # Style name -> (expected size, lowercased name)
+        self.run_format_findings = {}  # (style name, font, size, color, blank) -> run rule findings
+        self.spacing_findings = {}  # (line, line rule, before, after) -> spacing findings
+        
+    @property
+    def doc(self):
+        """python-docx Document, parsed only if a check needs the full object model
+        
+        Loaded from a lean copy of the package, so embedded images are never inflated.
+        """
+        if self._doc is None:
+            with self.timed('load_docx'):
+                self._doc = Document(lean_package(self.source))
+        return self._doc
+    
+    @doc.setter
+    def doc(self, document):
+        self._doc = document
+    
+    @property
+    def sections(self):
+        """Margins and header/footer text of each section, read without inflating media"""
+        if self._sections is None:
+            with self.timed('read_sections'):
+                with DocxStream(self.source) as stream:
+                    self._sections = stream.sections()
+        return self._sections
+    
+    def timed(self, phase):
+        """Context manager timing `phase` when timings are being collected"""
+        if self.timings is None:
+            return nullcontext()
+        return self.timings.phase(phase)
+    
+    def is_chapter_heading(self, text):
+        """Check if the text is a chapter heading"""
+        return self.headings_index.chapter(text) is not None
+    
+    def is_section_heading(self, text):
+        """Check if the text is a section or subsection heading"""
+        if not self.current_chapter:
+            return False
+            
+        # Check if text matches the pattern "X.Y[.Z] TITLE"
+        section = self.headings_index.section(text)
+        if section is None:
+            return False
+        section_num, section_text, cleaned_section_text = section
+        
+        # Check if this section exists in the current chapter
+        expected_text = self.headings_index.expected_title(self.current_chapter, section_num)
+        if expected_text is not None:
+            # Compare with cleaned section text
+            if cleaned_section_text == expected_text:
+                # Mark this section as found
+                self.found_sections[self.current_chapter][section_num] = True
+                # If original text was different, add a warning
+                if section_text.upper() != expected_text:
+                    self.structure_issues.append(f"Warning: Section {section_num} has extra characters. Expected: '{expected_text}', Found: '{section_text}'")
+                return True
+            else:
+                # Found section number but text doesn't match
+                self.structure_issues.append(f"Section {section_num} has incorrect title. Expected: '{expected_text}', Found: '{section_text}'")
+                return True
+                
+        # If we get here, it's either an extra section or a section in the wrong chapter
+        chapter = self.headings_index.home_chapter(section_num, cleaned_section_text)
+        if chapter is not None:
+            self.structure_issues.append(f"Section {section_num} '{section_text}' appears to be in the wrong chapter. Expected in: {chapter}")
+            return True
+                
+        # If we get here, it's an extra section not in our expected structure
+        self.extra_sections.append(f"{section_num} {section_text}")
+        return True
+    
+    def track_heading(self, text):
+        """Update chapter tracking for a paragraph and report whether it is a heading"""
+        if not text:
+            return False
+        chapter = self.headings_index.chapter(text)
+        if chapter is not None:
+            self.current_chapter = chapter
+            return True
+        return self.is_section_heading(text)
+    
+    def validate_structure(self):
+        """Validate the document structure against expected headings"""
+        # Check for missing chapters
+        for chapter in self.expected_structure:
+            if chapter not in self.found_sections or not self.found_sections[chapter]:
+                self.missing_sections.append(f"Missing chapter: {chapter}")
+            
+            # Check for missing sections in each chapter
+            if chapter in self.found_sections:
+                for section_num, section_text in self.expected_structure[chapter].items():
+                    if section_num not in self.found_sections[chapter]:
+                        self.missing_sections.append(f"Missing section: {chapter} -> {section_num} {section_text}")
+        
+        # Add missing sections to issues
+        if self.missing_sections:
+            self.structure_issues.append("Document structure issues found:")
+            self.structure_issues.extend(self.missing_sections)
+            
+        # Add extra sections to issues
+        if self.extra_sections:
+            self.structure_issues.append("\nUnexpected sections found in document:")
+            self.structure_issues.extend(self.extra_sections)
+    
+    def reset_structure(self):
+        """Reset chapter/section tracking before a pass over the document"""
+        self.found_sections = {chapter: {} for chapter in self.expected_structure}
+        self.current_chapter = None
+        self.missing_sections = []
+        self.extra_sections = []
+        self.structure_issues = []
+        
+    def structure_results(self):
+        """Validate the tracked headings and return the structure summary"""
+        self.validate_structure()
+        return {
+            'missing_sections': self.missing_sections,
+            'extra_sections': self.extra_sections,
+            'issues': self.structure_issues
+        }
+        
+    def check_document_structure(self):
+        """Check the document structure against the expected format
+        
+        Runs off the document outline: headings are found from paragraph text
+        without building records.
+        """
+        self.reset_structure()
+        
+        # Identify chapters and sections
+        with self.timed('open_document'):
+            stream = DocxStream(self.source)
+        with stream:
+            with self.timed('scan_outline'):
+                outline = stream.outline(self.headings_index.is_candidate)
+        for para in outline.entries:
+            self.track_heading(para.text.strip())
+        
+        return self.structure_results()
+        
+    def check_document(self, progress=None):
+        """Main method to check the entire document in a single pass
+        
+        Paragraphs are streamed from the document XML once; structure tracking
+        and the content checks are both fed from the same record. If given,
+        `progress` is called with each page's line issues as soon as the page
+        has been checked. Documents large enough for the shard pool have their
+        records built and checked by its workers, and are walked here in order.
+        """
+        # Reset tracking variables
+        self.reset_structure()
+        self.issues = []
+        self.line_issues = []
+        self.total_lines = 0
+        self.lines_with_issues = 0
+        self.sections_checked = 0
+        self.current_page = 1
+        self.line_page_mapping = {}
+        self.paragraph_pages = []
+        self.current_section = None
+        self.in_abstract = False
+        self.in_references = False
+        self.after_abstract = False
+        self.pages_skipped = 0
+        self.headings = []
+        self.subheadings = []
+        self.images_found = 0
+        
+        # Initialize rules if not already set
+        if not hasattr(self, 'rules') or not self.rules:
+            self.rules = {}
+            
+        # Initialize pages list in rules
+        self.rules['pages'] = []
+        
+        # Set default values if not present
+        if 'start_checking_from' not in self.rules:
+            self.rules['start_checking_from'] = 'abstract'
+        if 'skip_pages' not in self.rules:
+            self.rules['skip_pages'] = 14
+            
+        # Now it's safe to access these values
+        self.skip_until_abstract = (self.rules['start_checking_from'] == 'abstract')
+        self.skip_page_count = self.rules['skip_pages']
+        
+        log.debug("Will skip first %d pages", self.skip_page_count)
+        
+        # Check document-wide settings
+        self.check_margins()
+        self.check_page_numbering()
+        
+        page_start = 0  # Index in self.line_issues where the current page begins
+        document_issues = len(self.issues)  # Issues found before the pass, e.g. margins
+        line_findings = 0
+        ranges = RangeTracker()
+        
+        reuse = None
+        if self.paragraph_cache is not None:
+            reuse = self.cached_record
+        
+        with self.timed('open_document'):
+            stream = DocxStream(self.source)
+            if self.shards is not None:
+                stream = self.shards.open(stream, self.profile)
+        with stream:
+            # The skipped pages only feed structure and page tracking, so they
+            # are scanned as an outline; records start after the last of them
+            with self.timed('scan_outline'):
+                outline = stream.outline(self.headings_index.is_candidate, self.skip_page_count)
+            for para in outline.entries:
+                self.total_lines = para.index + 1
+                self.current_paragraph = para
+                self.track_heading(para.text.strip())
+                previous_page = self.current_page
+                if self.update_page_break(para) and progress is not None:
+                    progress(self.page_event(previous_page, page_start, stream))
+                    page_start = len(self.line_issues)
+            self.total_lines = outline.paragraph_count
+            non_empty_paragraphs = outline.non_empty
+            if outline.start is not None:
+                log.debug("Reached page %d, starting checks at paragraph %d", self.current_page, outline.start + 1)
+            
+            # (record, cached findings entry or None) for every paragraph checked
+            if isinstance(stream, DocxStream):
+                paragraphs = ((para, None) for para in stream.paragraphs(reuse))
+            else:
+                paragraphs = stream.paragraphs()
+            if self.timings is not None:
+                paragraphs = self.timings.iterate('parse_paragraphs', paragraphs)
+            for para, entry in paragraphs:
+                self.total_lines += 1
+                self.current_paragraph = para
+                line_text = para.text.strip()
+                if line_text:
+                    non_empty_paragraphs += 1
+                
+                is_heading = self.track_heading(line_text)
+                
+                # Update page tracking first - this updates self.current_page
+                previous_page = self.current_page
+                page_break_found = self.update_page_break(para)
+                if page_break_found and progress is not None:
+                    progress(self.page_event(previous_page, page_start, stream))
+                    page_start = len(self.line_issues)
+                
+                # Skip empty paragraphs unless they contain page breaks
+                if not line_text and not page_break_found:
+                    continue
+                    
+                # Chapter and section headings are validated by the structure check
+                if is_heading:
+                    continue
+                    
+                # Update section tracking
+                prev_section = self.current_section
+                self.update_section_tracking(line_text)
+                
+                # Handle abstract checking if needed
+                if self.skip_until_abstract and self.in_abstract:
+                    self.skip_until_abstract = False
+                    self.after_abstract = True
+                    
+                if prev_section != self.current_section:
+                    self.sections_checked += 1
+                    
+                line_issues = self.paragraph_findings(para, entry)
+                line_has_issues = bool(line_issues)
+                line_findings += len(line_issues)
+                ranges.add(line_issues, self.total_lines, self.current_page)
+                
+                # Add line to issues if it has any problems
+                if line_has_issues or page_break_found:
+                    self.lines_with_issues += 1
+                    self.line_issues.append({
+                        'line_number': self.total_lines,
+                        'page_number': self.current_page,
+                        'text': line_text[:200] + ('...' if len(line_text) > 200 else ''),
+                        'issues': line_issues,
+                        'is_page_break': page_break_found
+                    })
+        
+            self.paragraph_pages = stream.paragraph_pages
+            if progress is not None:
+                progress(self.page_event(self.current_page, page_start, stream))
+        
+        self.rules['lines_per_page'] = max(40, min(60, non_empty_paragraphs // 10))
+        structure_results = self.structure_results()
+        
+        # Check headers and footers
+        try:
+            header_footer_issues = self.check_headers_footers()
+            if isinstance(header_footer_issues, list) and header_footer_issues:
+                self.issues.extend(header_footer_issues)
+        except Exception:
+            log.exception("Error checking headers/footers")
+            self.issues.append("Error checking headers and footers")
+            
+        # Add structure issues collected during the pass
+        self.issues.extend(structure_results['issues'])
+        
+        # Line findings are listed once, as ranges of consecutive checked lines,
+        # after the document-wide issues found before the pass
+        total_issues = len(self.issues) + line_findings
+        self.issues[document_issues:document_issues] = ranges.finish()
+            
+        # Calculate statistics
+        issue_percentage = (self.lines_with_issues / self.total_lines) * 100 if self.total_lines > 0 else 0
+        
+        summary = {
+            'total_issues': total_issues,
+            'total_lines': self.total_lines,
+            'lines_with_issues': self.lines_with_issues,
+            'issue_percentage': round(float(issue_percentage), 2),
+            'sections_checked': self.sections_checked,
+            'images_found': self.images_found,
+            'structure_issues': {
+                'missing_sections': structure_results['missing_sections'],
+                'extra_sections': structure_results['extra_sections']
+            },
+            'pages_skipped': self.pages_skipped,
+            'page_count': self.current_page
+        }
+        
+        # Process line issues to ensure they have all required fields
+        processed_line_issues = []
+        for issue in self.line_issues:
+            processed_line_issues.append({
+                'line_number': issue.get('line_number', 0),
+                'text': issue.get('text', ''),
+                'page_number': issue.get('page_number', 1),
+                'is_page_break': issue.get('is_page_break', False),
+                'issues': issue.get('issues', [])
+            })
+        
+        return {
+            'issues': self.issues,
+            'line_issues': processed_line_issues,
+            'headings': self.headings,
+            'subheadings': self.subheadings,
+            'summary': summary
+        }
+        
+    def page_event(self, page, start, stream):
+        """Progress event for a checked page: its line issues and the pass position"""
+        return {
+            'page': page,
+            'line_issues': self.line_issues[start:],
+            'lines_checked': self.total_lines,
+            'progress': round(stream.progress(), 3)
+        }
+        
+    def check_headers_footers(self):
+        """Check headers and footers after abstract"""
+        issues = []
+        if not self.after_abstract:
+            return issues
+            
+        for section in self.sections:
+            # Check header
+            header_text = section.header_text
+            if self.rules['required_header'].lower() not in header_text.lower():
+                issues.append(f"Header should contain: '{self.rules['required_header']}'")
+            
+            # Check footer
+            footer_text = section.footer_text
+            if (self.rules['required_footer_left'].lower() not in footer_text.lower() or 
+                    'page' not in footer_text.lower()):
+                issues.append("Footer should contain department name and page number")
+                    
+        return issues
+            
+    def estimate_page_number(self, line_num):
+        """Estimate page number based on line number and content"""
+        # Convert line_num to int to ensure it's a valid dictionary key
+        line_num_int = int(round(line_num))
+        
+        # Line numbers count body paragraphs, so the page map answers directly
+        if 0 < line_num_int <= len(self.paragraph_pages):
+            return self.paragraph_pages[line_num_int - 1]
+            
+        # If we've already mapped this line to a page, return that
+        if line_num_int in self.line_page_mapping:
+            return self.line_page_mapping[line_num_int]
+            
+        # Otherwise estimate based on lines per page
+        estimated_page = (line_num_int // self.rules['lines_per_page']) + 1
+        self.line_page_mapping[line_num_int] = estimated_page
+        return estimated_page
+        
+    def update_page_break(self, para):
+        """Check if paragraph contains a page break and update current page"""
+        # Page boundaries are precomputed structurally by the document stream
+        if para.has_page_break:
+            self.current_page = para.page
+            self.rules['pages'].append({
+                'page': self.current_page,
+                'line': self.total_lines,
+                'content': para.text[:100] + ('...' if len(para.text) > 100 else '')
+            })
+            return True
+        return False
+    
+    def check_page_numbering(self):
+        """Check page numbering format (Roman before abstract, numbers after)"""
+        # This is a simplified check as python-docx has limited access to page numbers
+        self.issues.append("Note: Page numbers are estimated. Please verify manually - Roman numerals before abstract, numbers after")
+        
+    def check_page_number_sequence(self):
+        """Check if page numbers follow the correct sequence"""
+        # This is a simplified check as detailed page number sequence checking is complex
+        # and would require more sophisticated document analysis
+        return []
+    
+
+    def check_lists(self):
+        """Check that lists use bullets, not Roman numerals"""
+        for para in self.doc.paragraphs:
+            if para.style.name.startswith('List'):
+                if 'List Number' in para.style.name:
+                    self.issues.append("Use bullet points for lists, not numbered lists")
+                    break  # Only show this warning once
+    
+    def cached_record(self, key):
+        """Record previously built for a paragraph with this content hash"""
+        entry = self.paragraph_cache.get((self.profile.hash, key))
+        return entry[0] if entry is not None else None
+    
+    def check_paragraph(self, para):
+        """Run the paragraph and run checks, returning (findings, has_image_issue)
+        
+        Findings carry no line number so they can be reused wherever the same
+        paragraph turns up again.
+        """
+        findings = []
+        
+        # Check paragraph-level formatting
+        findings.extend(self.check_alignment(para))
+        findings.extend(self.check_spacing(para))
+        
+        # Check for images and their alignment
+        image_issues = self.check_image_alignment(para)
+        findings.extend(image_issues)
+        
+        # Check runs within the paragraph; the run rules only see a run's
+        # formatting, so they are evaluated once per distinct formatting
+        table = self.run_format_findings
+        style_name = para.style_name
+        for run in para.runs:
+            key = (style_name, run.font_name, run.size_half_points, run.color, not run.text.strip())
+            run_findings = table.get(key)
+            if run_findings is None:
+                run_findings = table[key] = self.check_run(para, run)
+            if run_findings:
+                findings.extend(run_findings)
+        return findings, bool(image_issues)
+    
+    def check_run(self, para, run):
+        """Findings of the font, size and color rules for one run"""
+        return self.check_font(run) + self.check_font_size(para, run) + self.check_text_color(run)
+    
+    def paragraph_findings(self, para, entry=None):
+        """Issues of the current line, reusing cached findings for unchanged paragraphs
+        
+        Findings are Issue codes; their line number comes from the line issue
+        entry they are listed under, and messages are rendered for display.
+        `entry` is a (record, findings, has_image_issue) already found for this
+        paragraph, e.g. by a shard worker.
+        """
+        cache_key = (self.profile.hash, para.key)
+        if entry is None and self.paragraph_cache is not None and para.key is not None:
+            entry = self.paragraph_cache.get(cache_key)
+        if entry is None:
+            findings, has_image_issue = self.check_paragraph(para)
+            if self.paragraph_cache is not None and para.key is not None:
+                self.paragraph_cache.put(cache_key, (para, findings, has_image_issue))
+        else:
+            _, findings, has_image_issue = entry
+        
+        if has_image_issue:
+            self.images_found += 1
+        return findings
+    
+    def check_text_color(self, run):
+        """Check if text color is black"""
+        if run.color and run.color != '000000':
+            return [Issue(IssueCode.TEXT_COLOR)]
+        return []
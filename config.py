@@ -1,9 +1,12 @@
 import os
 import json
+import logging
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Dict, Any
 
+log = logging.getLogger(__name__)
+
 @dataclass
 class DocumentCheck:
     filename: str
@@ -24,8 +27,12 @@ class Config:
     # Admin settings
     admin_username: str = 'admin'
     admin_password: str = 'admin123'  # In production, use environment variables
-    document_checks: List[Dict] = field(default_factory=list)
+    document_checks: List[Dict] = field(default_factory=list)  # Legacy history, now kept in the check log
     
+    def rule_overrides(self):
+        """Profile rules replaced by the admin settings: the required line spacing"""
+        return {'required_line_spacing': float(self.required_line_spacing)}
+
     @classmethod
     def load(cls, filename='config.json'):
         default_config = cls()
@@ -35,7 +42,7 @@ class Config:
                     data = json.load(f)
                     return cls(**data)
         except Exception as e:
-            print(f"Warning: Could not load config file: {e}")
+            log.warning("Could not load config file: %s", e)
         return default_config
     
     def save(self, filename='config.json'):
@@ -43,11 +50,14 @@ class Config:
             # Check if we can write to the directory
             dir_path = os.path.dirname(os.path.abspath(filename))
             if not os.access(dir_path, os.W_OK):
-                print("Warning: Running in read-only mode, config not saved")
+                log.warning("Running in read-only mode, config not saved")
                 return
                 
             # Convert to dict and handle any non-serializable fields
             data = self.__dict__.copy()
+            if not data.get('document_checks'):
+                # Check history lives in the check log; legacy history stays until check_log.py moves it
+                data.pop('document_checks', None)
             temp_file = f"{filename}.tmp"
             
             # Write to temporary file first
@@ -61,28 +71,13 @@ class Config:
                 os.rename(temp_file, filename)
                 
         except Exception as e:
-            print(f"Warning: Could not save config: {e}")
+            log.warning("Could not save config: %s", e)
             # Clean up temp file if it exists
             if 'temp_file' in locals() and os.path.exists(temp_file):
                 try:
                     os.unlink(temp_file)
                 except:
                     pass
-    
-    def log_document_check(self, filename: str, issues_found: int, user_ip: str, metadata: Dict[str, Any]):
-        """Log a document check event"""
-        check = {
-            'filename': filename,
-            'timestamp': datetime.now().isoformat(),
-            'issues_found': issues_found,
-            'user_ip': user_ip,
-            'metadata': metadata
-        }
-        self.document_checks.append(check)
-        # Keep only the last 100 checks
-        if len(self.document_checks) > 100:
-            self.document_checks = self.document_checks[-100:]
-        self.save()
 
 # Global config instance
 config = Config.load()
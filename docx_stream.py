@@ -0,0 +1,841 @@
+import hashlib
+import io
+import posixpath
+import zipfile
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterator, List, Optional
+
+from lxml import etree
+
+# WordprocessingML / DrawingML namespaces and the Clark-notation tags used below
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+WP_NS = 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing'
+REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+RT_OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+RT_STYLES = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles'
+RT_THEME = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/theme'
+
+
+def w(tag):
+    return f'{{{W_NS}}}{tag}'
+
+
+W_BODY = w('body')
+W_P = w('p')
+W_R = w('r')
+W_HYPERLINK = w('hyperlink')
+W_PPR = w('pPr')
+W_RPR = w('rPr')
+W_PSTYLE = w('pStyle')
+W_RSTYLE = w('rStyle')
+W_BASED_ON = w('basedOn')
+W_DOC_DEFAULTS = w('docDefaults')
+W_RPR_DEFAULT = w('rPrDefault')
+W_PPR_DEFAULT = w('pPrDefault')
+W_JC = w('jc')
+W_RFONTS = w('rFonts')
+W_SZ = w('sz')
+W_COLOR = w('color')
+W_T = w('t')
+W_TAB = w('tab')
+W_PTAB = w('ptab')
+W_BR = w('br')
+W_LAST_RENDERED_PAGE_BREAK = w('lastRenderedPageBreak')
+W_PAGE_BREAK_BEFORE = w('pageBreakBefore')
+W_SECTPR = w('sectPr')
+W_CR = w('cr')
+W_NO_BREAK_HYPHEN = w('noBreakHyphen')
+W_STYLE = w('style')
+W_NAME = w('name')
+W_VAL = w('val')
+W_TYPE = w('type')
+W_STYLE_ID = w('styleId')
+W_DEFAULT = w('default')
+W_ASCII = w('ascii')
+W_ASCII_THEME = w('asciiTheme')
+W_PGMAR = w('pgMar')
+W_LEFT = w('left')
+W_RIGHT = w('right')
+W_SPACING = w('spacing')
+W_LINE = w('line')
+W_LINE_RULE = w('lineRule')
+W_BEFORE = w('before')
+W_AFTER = w('after')
+W_BEFORE_AUTOSPACING = w('beforeAutospacing')
+W_AFTER_AUTOSPACING = w('afterAutospacing')
+W_HEADER_REFERENCE = w('headerReference')
+W_FOOTER_REFERENCE = w('footerReference')
+R_ID = f'{{{R_NS}}}id'
+A_BLIP = f'{{{A_NS}}}blip'
+A_MAJOR_FONT = f'{{{A_NS}}}majorFont'
+A_MINOR_FONT = f'{{{A_NS}}}minorFont'
+A_LATIN = f'{{{A_NS}}}latin'
+WP_INLINE = f'{{{WP_NS}}}inline'
+WP_EXTENT = f'{{{WP_NS}}}extent'
+
+EMU_PER_INCH = 914400
+EMU_PER_TWIP = 635
+EMU_PER_POINT = 12700
+# EMUs per unit of an ST_UniversalMeasure such as '2.5cm'
+EMU_PER_UNIT = {'mm': 36000, 'cm': 360000, 'in': 914400, 'pt': 12700, 'pc': 152400, 'pi': 152400}
+
+# Text equivalents of run inner-content, as python-docx renders them in `run.text`
+_RUN_TEXT_CHARS = {W_TAB: '\t', W_PTAB: '\t', W_CR: '\n', W_NO_BREAK_HYPHEN: '-'}
+
+
+@dataclass
+class RunRecord:
+    """Text and effective formatting (direct, style and docDefaults) of a `w:r`"""
+    text: str
+    font_name: Optional[str] = None
+    size_half_points: Optional[int] = None
+    color: Optional[str] = None
+    has_image: bool = False
+    image_widths: List[int] = field(default_factory=list)  # EMUs, one per wp:inline
+
+    @property
+    def size_pt(self):
+        if self.size_half_points is None:
+            return None
+        return self.size_half_points / 2
+
+
+@dataclass
+class ParagraphRecord:
+    """A body-level `w:p` flattened into plain values for the rule checks"""
+    index: int
+    text: str
+    style_name: str
+    style_id: Optional[str]
+    alignment: Optional[str]  # raw w:jc/@w:val, None when not set on the paragraph
+    runs: List[RunRecord]
+    # Effective spacing: w:line is 240ths of a line for the 'auto' rule and
+    # twips for 'exact'/'atLeast'; before/after are EMUs, None when auto-spaced
+    line_spacing: int = 240
+    line_rule: str = 'auto'
+    space_before: Optional[int] = 0
+    space_after: Optional[int] = 0
+    page: int = 1  # page the paragraph ends on
+    has_page_break: bool = False  # a page boundary falls before or inside it
+    key: Optional[bytes] = None  # content hash, set when paragraphs are hashed
+
+
+@dataclass
+class OutlineEntry:
+    """A paragraph kept in a document outline: its text and where it falls in the page sequence"""
+    index: int
+    text: str
+    page: int
+    has_page_break: bool
+
+
+@dataclass
+class Outline:
+    """Headings and page boundaries of a document body, found from paragraph text alone"""
+    entries: List[OutlineEntry] = field(default_factory=list)  # heading candidates and page-boundary paragraphs
+    paragraph_count: int = 0  # paragraphs scanned
+    non_empty: int = 0  # scanned paragraphs with text
+    start: Optional[int] = None  # index of the first paragraph after the scan, when it stopped early
+
+
+def scan_outline(paragraphs, is_heading, skip_pages=None) -> Outline:
+    """Collect an Outline from paragraphs with index, text, page and has_page_break
+
+    `is_heading(stripped text)` picks the headings worth keeping. With
+    `skip_pages`, the scan stops after the paragraph at which page `skip_pages`
+    begins, leaving the rest of `paragraphs` unread.
+    """
+    outline = Outline()
+    for para in paragraphs:
+        outline.paragraph_count += 1
+        text = para.text.strip()
+        if text:
+            outline.non_empty += 1
+        if para.has_page_break or is_heading(text):
+            outline.entries.append(OutlineEntry(para.index, para.text, para.page, para.has_page_break))
+            if skip_pages is not None and para.has_page_break and para.page >= skip_pages:
+                outline.start = para.index + 1
+                break
+    return outline
+
+
+@dataclass
+class SectionRecord:
+    """Page margins and default header/footer text of a document section"""
+    left_margin: Optional[int]  # EMUs, None when not set
+    right_margin: Optional[int]
+    header_text: str = ''
+    footer_text: str = ''
+
+
+def source_file(source):
+    """A path or binary file object for a document given as a path, file or bytes"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+
+def lean_package(source):
+    """An in-memory copy of a .docx whose binary parts (images, fonts, OLE objects) are empty
+
+    python-docx loads every package part, so opening this copy instead of the
+    original gives the same object model without ever inflating media. Only
+    the XML and relationship parts are decompressed; the copy is stored
+    uncompressed so building it costs no compression.
+    """
+    lean = io.BytesIO()
+    with zipfile.ZipFile(source_file(source)) as original, zipfile.ZipFile(lean, 'w', zipfile.ZIP_STORED) as copy:
+        for info in original.infolist():
+            if info.filename.endswith(('.xml', '.rels')):
+                copy.writestr(info.filename, original.read(info))
+            else:
+                copy.writestr(info.filename, b'')
+    lean.seek(0)
+    return lean
+
+
+def _relationships(zf, part_name):
+    """Yield (ID, type, target part name) for the internal relationships of a part"""
+    directory, filename = posixpath.split(part_name)
+    rels_name = posixpath.join(directory, '_rels', f'{filename}.rels')
+    try:
+        root = etree.fromstring(zf.read(rels_name))
+    except KeyError:
+        return
+    for rel in root.iter(f'{{{REL_NS}}}Relationship'):
+        if rel.get('TargetMode') == 'External':
+            continue
+        target = rel.get('Target', '')
+        if target.startswith('/'):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join(directory, target))
+        yield rel.get('Id'), rel.get('Type'), target
+
+
+def _read_rels(zf, part_name):
+    """Return {relationship type: target part name} for a package part"""
+    rels = {}
+    for _, rel_type, target in _relationships(zf, part_name):
+        rels.setdefault(rel_type, target)
+    return rels
+
+
+def main_document_part(zf):
+    """Name of a package's main document part, from the package relationships"""
+    return _read_rels(zf, '').get(RT_OFFICE_DOCUMENT, 'word/document.xml')
+
+
+def _twips_measure(value):
+    """EMUs of an ST_SignedTwipsMeasure ('1440' or '2.5cm'), None when unset or invalid"""
+    if value is None:
+        return None
+    try:
+        if 'i' in value or 'm' in value or 'p' in value:
+            return int(round(float(value[:-2]) * EMU_PER_UNIT[value[-2:]]))
+        return int(int(round(float(value))) * EMU_PER_TWIP)
+    except (KeyError, ValueError):
+        return None
+
+
+def _on(el):
+    """Value of an OOXML on/off property element that is present"""
+    return el.get(W_VAL, 'true') not in ('0', 'false', 'off')
+
+
+class PageTracker:
+    """Count page boundaries from the structure of the document XML
+
+    Explicit boundaries are hard page breaks (``w:br w:type="page"``),
+    ``w:pageBreakBefore`` and next/odd/even-page section breaks. Word also
+    records where it last laid out a page with ``w:lastRenderedPageBreak``,
+    which covers soft breaks too. A rendered break that directly follows an
+    explicit one (no text in between) marks the same boundary and is not
+    counted twice.
+    """
+
+    def __init__(self):
+        self.page = 1
+        self._pending = False  # explicit boundary not yet confirmed by a rendered one
+        self._section_break = False
+        self._first_paragraph = True
+
+    # Every value carried_state() can return
+    CARRIED_STATES = ((False, False), (True, False), (False, True))
+
+    @classmethod
+    def resumed(cls, state):
+        """A tracker counting pages from 0 after a body paragraph, with a `carried_state()` to resume from"""
+        tracker = cls()
+        tracker.page = 0
+        tracker._pending, tracker._section_break = state
+        tracker._first_paragraph = False
+        return tracker
+
+    def carried_state(self):
+        """What besides the page count carries over to the next paragraph: (pending, section break)
+
+        A pending section break makes a pending explicit break irrelevant, since
+        the break it starts the next paragraph with is pending in any case.
+        """
+        return (False, True) if self._section_break else (self._pending, False)
+
+    def _explicit_break(self):
+        self.page += 1
+        self._pending = True
+
+    def paragraph(self, p):
+        """Advance over a body-level paragraph and return the page it ends on"""
+        start = self.page
+        if self._section_break:
+            self._section_break = False
+            self._explicit_break()
+        pPr = p.find(W_PPR)
+        if pPr is not None:
+            before = pPr.find(W_PAGE_BREAK_BEFORE)
+            if before is not None and _on(before) and self.page == start and not self._first_paragraph:
+                self._explicit_break()
+            sectPr = pPr.find(W_SECTPR)
+            if sectPr is not None:
+                sect_type = sectPr.find(W_TYPE)
+                if sect_type is None or sect_type.get(W_VAL, 'nextPage') != 'continuous':
+                    self._section_break = True
+        self._first_paragraph = False
+        self.scan(p)
+        return self.page
+
+    def scan(self, elem):
+        """Count the page breaks inside an element"""
+        for el in elem.iter(W_BR, W_LAST_RENDERED_PAGE_BREAK, W_T):
+            tag = el.tag
+            if tag == W_T:
+                if self._pending and el.text and el.text.strip():
+                    self._pending = False
+            elif tag == W_BR:
+                if el.get(W_TYPE) == 'page':
+                    self._explicit_break()
+            elif self._pending:
+                self._pending = False
+            else:
+                self.page += 1
+
+
+def body_paragraphs(events, pages):
+    """Yield the body-level `w:p` elements of `w:p` end events, feeding every body child to `pages`
+
+    Each element is cleared, and the body children before it are dropped, once
+    the consumer moves on, so memory stays flat however long the document is.
+    """
+    for _, elem in events:
+        parent = elem.getparent()
+        if parent is None or parent.tag != W_BODY:
+            # Paragraphs in tables, text boxes and content controls are not
+            # part of the body paragraph sequence
+            continue
+        # Tables and other body content between paragraphs can still
+        # carry page breaks; the consumed paragraphs before them are empty
+        while elem.getprevious() is not None:
+            pages.scan(parent[0])
+            del parent[0]
+        yield elem
+        elem.clear()
+
+
+def _parse_part(data):
+    """Parse the bytes of a package part, or return None when missing or malformed"""
+    if data is None:
+        return None
+    try:
+        return etree.fromstring(data)
+    except etree.XMLSyntaxError:
+        return None
+
+
+def _run_text(r):
+    """Text of a `w:r`, rendered the way python-docx renders `run.text`"""
+    parts = []
+    for child in r:
+        tag = child.tag
+        if tag == W_T:
+            parts.append(child.text or '')
+        elif tag == W_BR:
+            # Only text-wrapping breaks contribute a newline, like python-docx
+            if child.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag in _RUN_TEXT_CHARS:
+            parts.append(_RUN_TEXT_CHARS[tag])
+    return ''.join(parts)
+
+
+def _paragraph_text(p):
+    """Text of a `w:p`: its runs and hyperlinks, like python-docx's `paragraph.text`"""
+    parts = []
+    for child in p:
+        if child.tag == W_R:
+            parts.append(_run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(_run_text(r) for r in child.iterchildren(W_R))
+    return ''.join(parts)
+
+
+def _rpr_props(rPr, theme_fonts):
+    """Return the (font, half-point size, color) set directly on an rPr
+
+    Each value is None when the rPr does not set it. An explicit ``auto`` color
+    is kept as 'AUTO' so it still overrides a color inherited from a style.
+    """
+    if rPr is None:
+        return (None, None, None)
+    font = size = color = None
+    rFonts = rPr.find(W_RFONTS)
+    if rFonts is not None:
+        theme = rFonts.get(W_ASCII_THEME)
+        if theme is not None:
+            font = theme_fonts.get(theme[:5])  # 'major...' / 'minor...'
+        if font is None:
+            font = rFonts.get(W_ASCII)
+    sz = rPr.find(W_SZ)
+    if sz is not None:
+        try:
+            size = int(sz.get(W_VAL))
+        except (TypeError, ValueError):
+            size = None
+    color_el = rPr.find(W_COLOR)
+    if color_el is not None:
+        val = color_el.get(W_VAL)
+        if val:
+            color = val.upper()
+    return (font, size, color)
+
+
+def _spacing_props(pPr):
+    """Return the ((line, lineRule), before, after) set directly on a pPr's w:spacing
+
+    Each value is None when not set; before/after are EMUs, or 'auto' when
+    Word chooses the spacing itself (autospacing).
+    """
+    spacing = pPr.find(W_SPACING) if pPr is not None else None
+    if spacing is None:
+        return (None, None, None)
+    line = spacing.get(W_LINE)
+    if line is not None:
+        try:
+            line = (int(round(float(line))), spacing.get(W_LINE_RULE, 'auto'))
+        except ValueError:
+            line = None
+    sides = []
+    for side, autospacing in ((W_BEFORE, W_BEFORE_AUTOSPACING), (W_AFTER, W_AFTER_AUTOSPACING)):
+        auto = spacing.get(autospacing)
+        if auto is not None and auto not in ('0', 'false', 'off'):
+            sides.append('auto')
+        else:
+            sides.append(_twips_measure(spacing.get(side)))
+    return (line, sides[0], sides[1])
+
+
+def _merge(*levels):
+    """Pick each property from the first level that sets it"""
+    return tuple(next((value for value in values if value is not None), None) for values in zip(*levels))
+
+
+class StyleResolver:
+    """Resolve effective run formatting and paragraph spacing through docDefaults and the style chain
+
+    Styles are read once per document. Resolved properties are memoized per
+    style ID, per (paragraph style, run style, direct rPr values) combination
+    for runs and per (paragraph style, direct spacing) for paragraphs, so
+    resolving a run or a paragraph is a dictionary hit.
+    """
+
+    def __init__(self, styles_root=None, theme_fonts=None):
+        self.theme_fonts = theme_fonts or {}
+        self.defaults = (None, None, None)
+        self.spacing_defaults = (None, None, None)
+        self.default_paragraph_style_id = None
+        self._style_props = {}  # style ID -> (own rPr props, basedOn, own spacing)
+        self._resolved_styles = {}  # style ID -> (rPr props, spacing)
+        self._resolved_runs = {}
+        self._resolved_spacing = {}
+        if styles_root is not None:
+            self._load(styles_root)
+
+    def _load(self, root):
+        defaults = root.find(W_DOC_DEFAULTS)
+        if defaults is not None:
+            rPr_default = defaults.find(W_RPR_DEFAULT)
+            if rPr_default is not None:
+                self.defaults = _rpr_props(rPr_default.find(W_RPR), self.theme_fonts)
+            pPr_default = defaults.find(W_PPR_DEFAULT)
+            if pPr_default is not None:
+                self.spacing_defaults = _spacing_props(pPr_default.find(W_PPR))
+        for style in root.iter(W_STYLE):
+            style_id = style.get(W_STYLE_ID)
+            if style_id is None:
+                continue
+            based_on = style.find(W_BASED_ON)
+            self._style_props[style_id] = (
+                _rpr_props(style.find(W_RPR), self.theme_fonts),
+                based_on.get(W_VAL) if based_on is not None else None,
+                _spacing_props(style.find(W_PPR)),
+            )
+            if style.get(W_TYPE) == 'paragraph' and style.get(W_DEFAULT) in ('1', 'true', 'on'):
+                self.default_paragraph_style_id = style_id
+
+    def _resolve_style(self, style_id):
+        """(rPr props, spacing) a style sets itself or through its basedOn chain"""
+        try:
+            return self._resolved_styles[style_id]
+        except KeyError:
+            pass
+        levels = []
+        spacing_levels = []
+        seen = set()
+        current = style_id
+        while current is not None and current not in seen and current in self._style_props:
+            seen.add(current)
+            props, current, spacing = self._style_props[current]
+            levels.append(props)
+            spacing_levels.append(spacing)
+        resolved = (_merge(*levels) if levels else (None, None, None),
+                    _merge(*spacing_levels) if spacing_levels else (None, None, None))
+        self._resolved_styles[style_id] = resolved
+        return resolved
+
+    def style(self, style_id):
+        """Run properties a style sets itself or through its basedOn chain"""
+        return self._resolve_style(style_id)[0]
+
+    def spacing(self, paragraph_style_id, direct):
+        """Effective (line, line rule, before, after) for a paragraph
+
+        Unset spacing is single line spacing with nothing before or after;
+        before/after are None where Word auto-spaces the paragraph.
+        """
+        key = (paragraph_style_id, direct)
+        try:
+            return self._resolved_spacing[key]
+        except KeyError:
+            pass
+        if paragraph_style_id is None:
+            paragraph_style_id = self.default_paragraph_style_id
+        line, before, after = _merge(direct, self._resolve_style(paragraph_style_id)[1], self.spacing_defaults)
+        line_spacing, line_rule = line or (240, 'auto')
+        resolved = (line_spacing, line_rule,
+                    None if before == 'auto' else before or 0,
+                    None if after == 'auto' else after or 0)
+        self._resolved_spacing[key] = resolved
+        return resolved
+
+    def run(self, paragraph_style_id, run_style_id, direct):
+        """Effective (font, half-point size, color) for a run"""
+        key = (paragraph_style_id, run_style_id, direct)
+        try:
+            return self._resolved_runs[key]
+        except KeyError:
+            pass
+        if paragraph_style_id is None:
+            paragraph_style_id = self.default_paragraph_style_id
+        font, size, color = _merge(direct, self.style(run_style_id), self.style(paragraph_style_id), self.defaults)
+        if color == 'AUTO':
+            color = None
+        resolved = (font, size, color)
+        self._resolved_runs[key] = resolved
+        return resolved
+
+
+class DocxStream:
+    """Single forward pass over the paragraphs of a .docx without python-docx proxies
+
+    Only the package relationships, ``styles.xml`` and the main document part are
+    read, plus the header and footer parts when sections are asked for; media is
+    never decompressed. The document part is consumed with ``iterparse`` and every
+    body child is discarded as soon as it has been turned into a record, so memory
+    stays flat regardless of document length. `source` is a path, a seekable
+    binary file (such as an upload's spooled stream) or bytes.
+    """
+
+    def __init__(self, source):
+        self.zip = zipfile.ZipFile(source_file(source))
+        self.document_part = main_document_part(self.zip)
+        self.document_rels = _read_rels(self.zip, self.document_part)
+        self._setup(*self.style_parts())
+
+    def _setup(self, styles_xml, theme_xml):
+        self.style_names: Dict[str, str] = {}
+        self.paragraph_pages: List[int] = []
+        self.default_paragraph_style = 'Normal'
+        self.resolver = StyleResolver()
+        self._reading = None
+        self._reading_size = 0
+        self._pass = None  # the pass an outline() scan read, for paragraphs() to carry on
+        self.styles_key = b''
+        self._load_styles(styles_xml, theme_xml)
+
+    @classmethod
+    def from_style_parts(cls, styles_xml, theme_xml):
+        """A stream without a package, building records of elements parsed elsewhere
+
+        `styles_xml` and `theme_xml` are the bytes returned by `style_parts`.
+        """
+        stream = cls.__new__(cls)
+        stream.zip = None
+        stream.document_part = None
+        stream.document_rels = {}
+        stream._setup(styles_xml, theme_xml)
+        return stream
+
+    def _read_bytes(self, part_name):
+        """Bytes of a package part, or None when it is missing"""
+        if not part_name:
+            return None
+        try:
+            return self.zip.read(part_name)
+        except KeyError:
+            return None
+
+    def _read_part(self, part_name):
+        """Parse a package part, or return None when it is missing or malformed"""
+        return _parse_part(self._read_bytes(part_name))
+
+    def style_parts(self):
+        """Raw bytes of the styles and theme parts, None for a part the package lacks"""
+        return self._read_bytes(self.document_rels.get(RT_STYLES)), self._read_bytes(self.document_rels.get(RT_THEME))
+
+    def document_size(self):
+        """Uncompressed size of the main document part in bytes"""
+        return self.zip.getinfo(self.document_part).file_size
+
+    def _theme_fonts(self, theme_xml):
+        """Return {'major': typeface, 'minor': typeface} from the theme part"""
+        fonts = {}
+        root = _parse_part(theme_xml)
+        if root is None:
+            return fonts
+        for key, tag in (('major', A_MAJOR_FONT), ('minor', A_MINOR_FONT)):
+            font = next(root.iter(tag), None)
+            latin = font.find(A_LATIN) if font is not None else None
+            if latin is not None and latin.get('typeface'):
+                fonts[key] = latin.get('typeface')
+        return fonts
+
+    def _load_styles(self, styles_xml, theme_xml):
+        """Build the style name map and the formatting resolver from styles.xml"""
+        root = _parse_part(styles_xml)
+        if root is None:
+            return
+        # Paragraph hashes are only comparable between documents whose styles
+        # resolve the same way, so they are salted with the styles and theme
+        digest = hashlib.blake2b(styles_xml, digest_size=16)
+        if theme_xml is not None:
+            digest.update(theme_xml)
+        self.styles_key = digest.digest()
+        self.resolver = StyleResolver(root, self._theme_fonts(theme_xml))
+        for style in root.iter(W_STYLE):
+            if style.get(W_TYPE) != 'paragraph':
+                continue
+            name_el = style.find(W_NAME)
+            name = name_el.get(W_VAL) if name_el is not None else None
+            style_id = style.get(W_STYLE_ID)
+            if style_id is None or name is None:
+                continue
+            self.style_names[style_id] = name
+            if style.get(W_DEFAULT) in ('1', 'true', 'on'):
+                self.default_paragraph_style = name
+
+    def run_record(self, r, paragraph_style_id):
+        """Flatten a `w:r` element into a RunRecord with effective formatting"""
+        rPr = r.find(W_RPR)
+        run_style_id = None
+        if rPr is not None:
+            rStyle = rPr.find(W_RSTYLE)
+            if rStyle is not None:
+                run_style_id = rStyle.get(W_VAL)
+        direct = _rpr_props(rPr, self.resolver.theme_fonts)
+        font_name, size, color = self.resolver.run(paragraph_style_id, run_style_id, direct)
+
+        record = RunRecord(_run_text(r), font_name, size, color)
+        for _ in r.iter(A_BLIP):
+            record.has_image = True
+            for inline in r.iter(WP_INLINE):
+                # The drawing's size on the page; a:ext elements below it can be
+                # extension lists with no size at all
+                extent = inline.find(WP_EXTENT)
+                if extent is not None:
+                    record.image_widths.append(int(extent.get('cx', 0)))
+            break
+        return record
+
+    def paragraph_record(self, p, index):
+        """Flatten a body-level `w:p` element into a ParagraphRecord"""
+        style_name = self.default_paragraph_style
+        style_id = None
+        alignment = None
+        spacing = None
+        pPr = p.find(W_PPR)
+        if pPr is not None:
+            pStyle = pPr.find(W_PSTYLE)
+            if pStyle is not None:
+                style_id = pStyle.get(W_VAL)
+                if style_id in self.style_names:
+                    style_name = self.style_names[style_id]
+                else:
+                    style_id = None
+            jc = pPr.find(W_JC)
+            if jc is not None:
+                alignment = jc.get(W_VAL)
+            spacing = _spacing_props(pPr)
+
+        runs = []
+        text_parts = []
+        for child in p:
+            if child.tag == W_R:
+                run = self.run_record(child, style_id)
+                runs.append(run)
+                text_parts.append(run.text)
+            elif child.tag == W_HYPERLINK:
+                # Hyperlink text counts towards the paragraph text but its runs are
+                # not paragraph runs, matching python-docx's Paragraph.runs
+                for r in child.iterchildren(W_R):
+                    text_parts.append(_run_text(r))
+
+        line_spacing, line_rule, space_before, space_after = self.resolver.spacing(style_id, spacing or (None, None, None))
+        return ParagraphRecord(index, ''.join(text_parts), style_name, style_id, alignment, runs,
+                               line_spacing, line_rule, space_before, space_after)
+
+    def progress(self):
+        """Fraction of the document part consumed by the current pass"""
+        if self._reading is None or not self._reading_size:
+            return 0.0
+        return min(1.0, self._reading.tell() / self._reading_size)
+
+    def _body_paragraphs(self, pages):
+        """Yield body-level `w:p` elements, feeding every body child to `pages`"""
+        self._reading_size = self.document_size()
+        with self.zip.open(self.document_part) as stream:
+            self._reading = stream
+            yield from body_paragraphs(etree.iterparse(stream, events=('end',), tag=W_P, huge_tree=True), pages)
+        self._reading = None
+
+    def paragraph_key(self, p):
+        """Content hash of a `w:p` (text, pPr and run properties) under these styles"""
+        return hashlib.blake2b(etree.tostring(p), digest_size=16, key=self.styles_key).digest()
+
+    def _walk(self):
+        """Yield (index, `w:p`, page, has_page_break) for every body paragraph, filling the page map"""
+        pages = PageTracker()
+        self.paragraph_pages = []
+        for index, p in enumerate(self._body_paragraphs(pages)):
+            previous_page = pages.page
+            page = pages.paragraph(p)
+            self.paragraph_pages.append(page)
+            yield index, p, page, page != previous_page
+
+    def outline(self, is_heading, skip_pages=None) -> Outline:
+        """Scan the body for headings and page boundaries without building records
+
+        Only paragraph text is read, not runs or formatting. With `skip_pages`
+        the scan stops after the paragraph at which page `skip_pages` begins.
+        The next `paragraphs()` call carries on where the scan stopped, and
+        yields nothing if it reached the end.
+        """
+        self._pass = self._walk()
+        return scan_outline((OutlineEntry(index, _paragraph_text(p), page, has_page_break)
+                             for index, p, page, has_page_break in self._pass), is_heading, skip_pages)
+
+    def paragraphs(self, reuse=None, start=0) -> Iterator[ParagraphRecord]:
+        """Yield a record for every body-level paragraph, in document order
+
+        The paragraph index -> page map is filled in as the records are produced
+        and is complete in ``self.paragraph_pages`` once iteration finishes.
+        After an `outline()` scan, only the paragraphs it left unread are
+        yielded. Paragraphs before index `start` are counted for their pages
+        but yield no record. With `reuse`, every paragraph is hashed and
+        `reuse(key)` may return a record seen before for identical content,
+        which is used instead of flattening the element again.
+        """
+        walk, self._pass = self._pass, None
+        for index, p, page, has_page_break in walk if walk is not None else self._walk():
+            if index < start:
+                continue
+            if reuse is None:
+                record = self.paragraph_record(p, index)
+            else:
+                key = self.paragraph_key(p)
+                cached = reuse(key)
+                if cached is not None:
+                    record = replace(cached, index=index)
+                else:
+                    record = self.paragraph_record(p, index)
+                    record.key = key
+            record.page = page
+            record.has_page_break = has_page_break
+            yield record
+
+    def _section_properties(self):
+        """Yield the `w:sectPr` of every section in document order"""
+        with self.zip.open(self.document_part) as stream:
+            for _, elem in etree.iterparse(stream, events=('end',), tag=(W_P, W_SECTPR), huge_tree=True):
+                parent = elem.getparent()
+                if parent is None or parent.tag != W_BODY:
+                    continue  # nested paragraphs, and sectPrs handled with their paragraph
+                if elem.tag == W_SECTPR:
+                    yield elem  # the body's own sectPr, describing the last section
+                    continue
+                pPr = elem.find(W_PPR)
+                sectPr = pPr.find(W_SECTPR) if pPr is not None else None
+                if sectPr is not None:
+                    yield sectPr
+                while elem.getprevious() is not None:
+                    del parent[0]
+                elem.clear()
+
+    def _header_footer_text(self, sectPr, tag, targets, inherited):
+        """Text of a section's default header or footer, or `inherited` without one"""
+        for reference in sectPr.iterchildren(tag):
+            if reference.get(W_TYPE) != 'default':
+                continue
+            root = self._read_part(targets.get(reference.get(R_ID)))
+            if root is None:
+                return ''
+            return ' '.join(_paragraph_text(p) for p in root.iterchildren(W_P))
+        return inherited
+
+    def sections(self) -> List[SectionRecord]:
+        """Margins and header/footer text of every section, in document order
+
+        A section without its own default header or footer shows the previous
+        section's, as in Word.
+        """
+        targets = {rel_id: target for rel_id, _, target in _relationships(self.zip, self.document_part)}
+        records = []
+        header = footer = ''
+        for sectPr in self._section_properties():
+            pgMar = sectPr.find(W_PGMAR)
+            left = right = None
+            if pgMar is not None:
+                left = _twips_measure(pgMar.get(W_LEFT))
+                right = _twips_measure(pgMar.get(W_RIGHT))
+            header = self._header_footer_text(sectPr, W_HEADER_REFERENCE, targets, header)
+            footer = self._header_footer_text(sectPr, W_FOOTER_REFERENCE, targets, footer)
+            records.append(SectionRecord(left, right, header, footer))
+        return records
+
+    def page_map(self) -> List[int]:
+        """Return the page each body paragraph ends on, indexed by paragraph"""
+        pages = PageTracker()
+        self.paragraph_pages = [pages.paragraph(p) for p in self._body_paragraphs(pages)]
+        return self.paragraph_pages
+
+    def close(self):
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,58 @@
+import re
+from typing import Dict, Optional, Tuple
+
+SECTION_HEADING = re.compile(r'^(\d+(?:\.\d+)*)\s+(.+)$')
+TRAILING_NUMBER = re.compile(r'\s*\d+\s*$')
+
+
+def normalize(text):
+    """Upper-case `text` and collapse its whitespace, as headings are compared"""
+    return ' '.join(text.upper().split())
+
+
+class HeadingMatcher:
+    """Expected chapter/section outline compiled into constant-time lookups
+
+    Built once per outline and shared by every DocumentChecker; it holds no
+    per-document state.
+    """
+
+    def __init__(self, expected_structure: Dict[str, Dict[str, str]]):
+        self.chapters = frozenset(expected_structure)
+        # (chapter, section number) -> expected title
+        self.sections: Dict[Tuple[str, str], str] = {}
+        # (section number, expected title) -> first chapter that declares it
+        self.home_chapters: Dict[Tuple[str, str], str] = {}
+        for chapter, sections in expected_structure.items():
+            for number, title in sections.items():
+                self.sections[(chapter, number)] = title
+                self.home_chapters.setdefault((number, title), chapter)
+
+    def chapter(self, text) -> Optional[str]:
+        """The normalized chapter name if `text` is a chapter heading"""
+        normalized = normalize(text)
+        return normalized if normalized in self.chapters else None
+
+    @staticmethod
+    def section(text) -> Optional[Tuple[str, str, str]]:
+        """Split an "X.Y[.Z] TITLE" heading into (number, title, cleaned title)"""
+        text = text.strip()
+        if not text or not text[0].isdigit():
+            return None
+        match = SECTION_HEADING.match(text)
+        if not match:
+            return None
+        number, title = match.groups()
+        # Cleaned title drops trailing page numbers and normalizes spacing
+        return number, title, normalize(TRAILING_NUMBER.sub('', title.strip()))
+
+    def is_candidate(self, text) -> bool:
+        """Whether `text` is a chapter heading or numbered like a section; other text never moves the tracking"""
+        return self.section(text) is not None or self.chapter(text) is not None
+
+    def expected_title(self, chapter, number) -> Optional[str]:
+        return self.sections.get((chapter, number))
+
+    def home_chapter(self, number, cleaned_title) -> Optional[str]:
+        """Chapter where a section with this number and title belongs"""
+        return self.home_chapters.get((number, cleaned_title))
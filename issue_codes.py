@@ -0,0 +1,144 @@
+from enum import Enum
+from typing import NamedTuple, Tuple
+
+
+class IssueCode(str, Enum):
+    """Kinds of line-level finding; the value is what results store"""
+    FONT = 'font'
+    FONT_SIZE = 'font_size'
+    ALIGNMENT = 'alignment'
+    TEXT_COLOR = 'text_color'
+    LINE_SPACING = 'line_spacing'
+    FIXED_LINE_SPACING = 'fixed_line_spacing'
+    PARAGRAPH_SPACING = 'paragraph_spacing'
+    IMAGE_ALIGNMENT = 'image_alignment'
+    IMAGE_WIDTH = 'image_width'
+
+
+# Message templates, filled from an issue's parameters when it is shown
+MESSAGES = {
+    IssueCode.FONT: "Font should be {0}, found '{1}'",
+    IssueCode.FONT_SIZE: "Font size should be {0}pt for '{1}', found {2}pt",
+    IssueCode.ALIGNMENT: "Alignment should be {0}, found {1}",
+    IssueCode.TEXT_COLOR: "Text color should be black",
+    IssueCode.LINE_SPACING: "Line spacing should be {0:g}, found {1:g}",
+    IssueCode.FIXED_LINE_SPACING: "Line spacing should be {0:g}, found {1} {2:g}pt",
+    IssueCode.PARAGRAPH_SPACING: "Spacing {0} paragraph should be at most {1:g}pt, found {2:g}pt",
+    IssueCode.IMAGE_ALIGNMENT: "Center align images",
+    IssueCode.IMAGE_WIDTH: "Image is too wide ({0:.1f} inches). Resize to be 6 inches or less.",
+}
+# Issues shown as {'message', 'type', 'severity', 'line'} objects rather than plain text
+SEVERITY = {
+    IssueCode.IMAGE_ALIGNMENT: 'high',
+    IssueCode.IMAGE_WIDTH: 'medium',
+}
+
+
+class Issue(NamedTuple):
+    """A finding on one line: its code and the values its message is built from"""
+    code: str
+    params: Tuple = ()
+
+
+class IssueRange(NamedTuple):
+    """One issue found on consecutive checked lines, `count` times in all"""
+    code: str
+    params: Tuple
+    first_line: int
+    last_line: int
+    first_page: int
+    last_page: int
+    count: int
+
+
+class RangeTracker:
+    """Collapse the issues of consecutive checked lines into IssueRanges
+
+    `add` is called for every checked line, with or without findings; an issue
+    missing from a line closes its open range.
+    """
+
+    def __init__(self):
+        self.ranges = []
+        self._open = {}  # Issue -> [first line, last line, first page, last page, count]
+
+    def add(self, findings, line, page):
+        counts = {}
+        for issue in findings:
+            counts[issue] = counts.get(issue, 0) + 1
+        for issue in [issue for issue in self._open if issue not in counts]:
+            self._close(issue)
+        for issue, count in counts.items():
+            span = self._open.get(issue)
+            if span is None:
+                self._open[issue] = [line, line, page, page, count]
+            else:
+                span[1] = line
+                span[3] = page
+                span[4] += count
+
+    def _close(self, issue):
+        self.ranges.append(IssueRange(issue[0], issue[1], *self._open.pop(issue)))
+
+    def finish(self):
+        """Every range, ordered by the line it starts on"""
+        for issue in list(self._open):
+            self._close(issue)
+        self.ranges.sort(key=lambda span: span[2])
+        return self.ranges
+
+
+def is_compact(issue):
+    """Whether `issue` is an Issue/IssueRange (a list once read back from JSON)"""
+    return isinstance(issue, (list, tuple))
+
+
+def message(issue):
+    """Human-readable text of an Issue or IssueRange"""
+    return MESSAGES[issue[0]].format(*issue[1])
+
+
+def render_line_issue(issue, line):
+    """An Issue on line `line` as 'Line N: ...', or an object for issues with a severity"""
+    if not is_compact(issue):
+        return issue  # already rendered
+    severity = SEVERITY.get(issue[0])
+    if severity is not None:
+        return {'message': message(issue), 'type': 'formatting', 'severity': severity, 'line': line}
+    return f"Line {line}: {message(issue)}"
+
+
+def render_issue(issue):
+    """A document-level issue or IssueRange as display text or object"""
+    if not is_compact(issue):
+        return issue
+    if len(issue) == 2:
+        return message(issue)
+    code, params, first_line, last_line, first_page, last_page, count = issue
+    text = message(issue)
+    if count > 1:
+        text += f" ({count} occurrences)"
+    severity = SEVERITY.get(code)
+    if severity is not None:
+        rendered = {'message': text, 'type': 'formatting', 'severity': severity, 'line': first_line}
+        if last_line != first_line:
+            rendered['last_line'] = last_line
+        return rendered
+    if last_line == first_line:
+        return f"Line {first_line}: {text}"
+    pages = f"page {first_page}" if first_page == last_page else f"pages {first_page}–{last_page}"
+    return f"Lines {first_line}–{last_line} ({pages}): {text}"
+
+
+def render_line_issues(line_issues):
+    """Line issue entries with their issues rendered"""
+    return [dict(entry, issues=[render_line_issue(issue, entry.get('line_number', 0)) for issue in entry.get('issues', [])])
+            for entry in line_issues]
+
+
+def render_result(result):
+    """A check result with every compact issue rendered, for JSON clients"""
+    rendered = dict(result, issues=[render_issue(issue) for issue in result.get('issues', [])])
+    if 'line_issues' in result:
+        rendered['line_issues'] = render_line_issues(result['line_issues'])
+    return rendered
@@ -0,0 +1,106 @@
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+
+class Job:
+    """A document check running in the background, with its progress events
+
+    Events are appended as pages finish and kept for the life of the job, so
+    any number of readers can follow the stream from any position.
+    """
+
+    def __init__(self, filename):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = 'queued'  # queued -> running -> done | error
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.progress = 0.0
+        self.pages_checked = 0
+        self.events: List[Dict[str, Any]] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self._changed = threading.Condition()
+
+    def _publish(self, event):
+        with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    def add_page(self, event):
+        """Record a page event reported by the checker"""
+        self.status = 'running'
+        self.pages_checked = event.get('page', self.pages_checked)
+        self.progress = event.get('progress', self.progress)
+        self._publish(dict(event, type='page'))
+
+    def finish(self, result):
+        self.result = result
+        self.progress = 1.0
+        self.finished = time.time()
+        self.status = 'done'
+        self._publish({'type': 'done', 'result': result})
+
+    def fail(self, error):
+        self.error = str(error)
+        self.finished = time.time()
+        self.status = 'error'
+        self._publish({'type': 'error', 'error': self.error})
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'error')
+
+    def wait_for_events(self, start, timeout):
+        """Return events from index `start`, waiting up to `timeout` for new ones"""
+        with self._changed:
+            if len(self.events) <= start and not self.is_finished:
+                self._changed.wait(timeout)
+            return self.events[start:]
+
+    def to_dict(self):
+        data = {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'progress': round(self.progress, 3),
+            'pages_checked': self.pages_checked,
+        }
+        if self.status == 'done':
+            data['result'] = self.result
+        elif self.status == 'error':
+            data['error'] = self.error
+        return data
+
+
+class JobStore:
+    """In-process registry of check jobs; finished jobs expire after `ttl` seconds"""
+
+    def __init__(self, ttl=15 * 60):
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def create(self, filename) -> Job:
+        job = Job(filename)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id):
+        """Forget a job that never started, e.g. because the check queue was full"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
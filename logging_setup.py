@@ -0,0 +1,81 @@
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'
+
+# ID of the request being served; set per request and per check, '-' otherwise
+request_id = contextvars.ContextVar('request_id', default='-')
+
+_listener = None
+_configured_pid = None
+_settings = ('INFO', '')
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request ID unless one was passed in `extra`"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id.get()
+        return True
+
+
+def parse_levels(spec):
+    """'docx_stream=DEBUG,check_pool=WARNING' -> {logger name: level}"""
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.strip().partition('=')
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level=None, levels=None, stream=None):
+    """Send logging through a queue to a background thread writing to `stream`
+
+    `level` is the root level and `levels` a 'logger=LEVEL,...' string of
+    per-module overrides. Records below their logger's level are dropped before
+    their message is formatted; the rest are queued by the calling thread and
+    written by a listener thread, so no request waits on log I/O.
+    """
+    global _listener, _configured_pid, _settings
+    if level is None:
+        level, levels = _settings
+    _settings = (level, levels or '')
+    if _listener is not None and _configured_pid == os.getpid():
+        _listener.stop()
+
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    for name, module_level in parse_levels(levels or '').items():
+        logging.getLogger(name).setLevel(module_level)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    records = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(RequestIdFilter())
+    for old in [h for h in root.handlers if isinstance(h, logging.handlers.QueueHandler)]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    _configured_pid = os.getpid()
+
+
+def ensure_logging():
+    """Restart the listener in a forked worker, which inherits the handler but not its thread"""
+    if _configured_pid is not None and _configured_pid != os.getpid():
+        configure_logging()
+
+
+@atexit.register
+def _flush():
+    if _listener is not None and _configured_pid == os.getpid():
+        _listener.stop()
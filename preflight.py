@@ -0,0 +1,110 @@
+import os
+import posixpath
+import zipfile
+from dataclasses import dataclass
+
+from lxml import etree
+
+from docx_stream import main_document_part, source_file
+
+CT_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+# Main document part content types of .docx, .docm, .dotx and .dotm packages
+MAIN_DOCUMENT_TYPES = {
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml',
+    'application/vnd.ms-word.document.macroEnabled.main+xml',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.template.main+xml',
+    'application/vnd.ms-word.template.macroEnabledTemplate.main+xml',
+}
+# Word saves password-protected documents as an OLE compound file, not a zip
+OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+MAX_CONTENT_TYPES_BYTES = 1 << 20
+MAX_ENTRIES = 10000
+MB = 1 << 20
+
+
+class PreflightError(ValueError):
+    """Raised when an upload is rejected before parsing; `reason` is a short code"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+@dataclass
+class PreflightReport:
+    """What the pre-flight stage learned about a package from its zip metadata"""
+    document_part: str
+    document_bytes: int  # uncompressed size of the main document part
+    total_bytes: int  # uncompressed size of every part
+    slow: bool = False  # large enough to be checked on the slow lane
+
+
+def preflight(source, max_document_mb=64, slow_document_mb=8, max_total_mb=512, max_ratio=100):
+    """Validate a .docx from its central directory and content types, without parsing the body
+
+    Rejects with PreflightError when the file is not a zip, is password
+    protected or encrypted, has no WordprocessingML main part, or whose sizes or
+    compression ratios exceed the limits (a zip bomb inflates far beyond what
+    it occupies). Only the central directory, ``[Content_Types].xml`` and the
+    package relationships are read, so this takes about a millisecond.
+    """
+    file = source_file(source)
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            head = f.read(8)
+    else:
+        head = file.read(8)
+        file.seek(0)
+    if head == OLE_SIGNATURE:
+        raise PreflightError('encrypted', "The document is password protected. Remove the password and upload it again.")
+
+    try:
+        zf = zipfile.ZipFile(file)
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, OSError, ValueError):
+        raise PreflightError('not_a_zip', "The file is not a valid .docx document.")
+    with zf:
+        entries = zf.infolist()
+        if len(entries) > MAX_ENTRIES:
+            raise PreflightError('too_many_parts', f"The document has too many parts ({len(entries)}).")
+        total = 0
+        for info in entries:
+            if info.flag_bits & 0x1:
+                raise PreflightError('encrypted', "The document is encrypted. Remove the password and upload it again.")
+            total += info.file_size
+            if info.file_size > MB and info.file_size > max_ratio * max(1, info.compress_size):
+                raise PreflightError('compression_ratio', f"The document part {info.filename} is compressed suspiciously well.")
+        if total > max_total_mb * MB:
+            raise PreflightError('too_large', f"The document expands to {total // MB} MB, more than the {max_total_mb} MB allowed.")
+
+        try:
+            info = zf.getinfo('[Content_Types].xml')
+        except KeyError:
+            raise PreflightError('not_a_docx', "The file is not a Word document (no content types).")
+        if info.file_size > MAX_CONTENT_TYPES_BYTES:
+            raise PreflightError('not_a_docx', "The document's content types are malformed.")
+        try:
+            content_types = etree.fromstring(zf.read(info))
+            document_part = main_document_part(zf)
+        except (etree.XMLSyntaxError, zipfile.BadZipFile, EOFError, ValueError):
+            raise PreflightError('corrupt', "The document's package metadata is corrupt.")
+        part_type = None
+        for override in content_types.iter(f'{{{CT_NS}}}Override'):
+            if override.get('PartName', '').lstrip('/') == document_part:
+                part_type = override.get('ContentType')
+                break
+        if part_type is None:
+            extension = posixpath.splitext(document_part)[1].lstrip('.').lower()
+            for default in content_types.iter(f'{{{CT_NS}}}Default'):
+                if default.get('Extension', '').lower() == extension:
+                    part_type = default.get('ContentType')
+                    break
+        if part_type not in MAIN_DOCUMENT_TYPES:
+            raise PreflightError('not_a_docx', "The file is not a Word document (no main document part).")
+        try:
+            document_bytes = zf.getinfo(document_part).file_size
+        except KeyError:
+            raise PreflightError('not_a_docx', "The document's main part is missing.")
+
+    if document_bytes > max_document_mb * MB:
+        raise PreflightError('too_large', f"The document text is {document_bytes // MB} MB, more than the {max_document_mb} MB allowed.")
+    return PreflightReport(document_part, document_bytes, total, slow=document_bytes > slow_document_mb * MB)
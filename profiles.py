@@ -0,0 +1,182 @@
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from headings import HeadingMatcher, normalize
+
+log = logging.getLogger(__name__)
+
+PROFILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+DEFAULT_PROFILE = 'default'
+
+# Rule name -> accepted types; every profile must define all of them
+RULE_TYPES = {
+    'font_name': (str,),
+    'heading1_size': (int, float),
+    'heading2_size': (int, float),
+    'normal_text_size': (int, float),
+    'line_spacing': (int, float),
+    'margin_min': (int, float),
+    'required_header': (str,),
+    'required_footer_left': (str,),
+    'required_line_spacing': (int, float),
+    'required_margin': (int, float),
+    'lines_per_page': (int,),
+}
+# Optional rules that override the checker defaults when present
+OPTIONAL_RULE_TYPES = {
+    'skip_pages': (int,),
+    'start_checking_from': (str,),
+    'max_space_before': (int, float),  # points
+    'max_space_after': (int, float),
+}
+
+
+class ProfileError(ValueError):
+    """Raised when a rule profile file is malformed"""
+
+
+@dataclass(frozen=True)
+class RuleProfile:
+    """A validated rule profile, compiled once and shared by every checker"""
+    name: str
+    version: int
+    description: str
+    rules: Mapping[str, Any]
+    outline: Mapping[str, Mapping[str, str]]
+    headings: HeadingMatcher
+    hash: str  # stable across processes and restarts; changes with any rule
+    overrides: Mapping[str, Any] = field(default_factory=dict)  # rules replaced by with_rules, e.g. admin settings
+
+
+def _validate(data, source):
+    if not isinstance(data, dict):
+        raise ProfileError(f"{source}: profile must be an object")
+    name = data.get('name')
+    if not isinstance(name, str) or not name:
+        raise ProfileError(f"{source}: 'name' must be a non-empty string")
+    if not isinstance(data.get('version', 1), int):
+        raise ProfileError(f"{source}: 'version' must be an integer")
+
+    rules = data.get('rules')
+    if not isinstance(rules, dict):
+        raise ProfileError(f"{source}: 'rules' must be an object")
+    for key in RULE_TYPES:
+        if key not in rules:
+            raise ProfileError(f"{source}: missing rule '{key}'")
+    for key, value in rules.items():
+        types = RULE_TYPES.get(key) or OPTIONAL_RULE_TYPES.get(key)
+        if types is None:
+            raise ProfileError(f"{source}: unknown rule '{key}'")
+        if isinstance(value, bool) or not isinstance(value, types):
+            raise ProfileError(f"{source}: rule '{key}' has the wrong type")
+
+    outline = data.get('outline', {})
+    if not isinstance(outline, dict):
+        raise ProfileError(f"{source}: 'outline' must be an object of chapters")
+    for chapter, sections in outline.items():
+        if not isinstance(sections, dict) or not all(
+                isinstance(number, str) and isinstance(title, str) for number, title in sections.items()):
+            raise ProfileError(f"{source}: chapter '{chapter}' must map section numbers to titles")
+
+
+def compile_profile(data, source='<profile>') -> RuleProfile:
+    """Validate raw profile data and precompute everything the checks need"""
+    _validate(data, source)
+    # Headings are matched in normalized form, so the outline is stored that way
+    outline = {
+        normalize(chapter): {number: normalize(title) for number, title in sections.items()}
+        for chapter, sections in data.get('outline', {}).items()
+    }
+    canonical = json.dumps({'rules': data['rules'], 'outline': outline}, sort_keys=True, separators=(',', ':'))
+    return RuleProfile(
+        name=data['name'],
+        version=data.get('version', 1),
+        description=data.get('description', ''),
+        rules=MappingProxyType(dict(data['rules'])),
+        outline=MappingProxyType({chapter: MappingProxyType(sections) for chapter, sections in outline.items()}),
+        headings=HeadingMatcher(outline),
+        hash=hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16],
+    )
+
+
+_overridden = {}
+
+
+def with_rules(profile, overrides) -> RuleProfile:
+    """`profile` with the rules in `overrides` replaced, compiled once per process
+
+    Returns `profile` itself when the overrides match its rules, so its hash,
+    and every cache keyed by it, stays the same.
+    """
+    changed = {key: value for key, value in (overrides or {}).items() if profile.rules.get(key) != value}
+    if not changed:
+        return profile
+    key = (profile.name, profile.hash, tuple(sorted(overrides.items())))
+    compiled = _overridden.get(key)
+    if compiled is None:
+        data = {
+            'name': profile.name,
+            'version': profile.version,
+            'description': profile.description,
+            'rules': dict(profile.rules, **overrides),
+            'outline': {chapter: dict(sections) for chapter, sections in profile.outline.items()},
+        }
+        compiled = compile_profile(data, f'{profile.name} with {", ".join(sorted(changed))} overridden')
+        compiled = _overridden[key] = replace(compiled, overrides=MappingProxyType(dict(overrides)))
+    return compiled
+
+
+def resolve_profile(name, overrides=None) -> RuleProfile:
+    """The configured profile `name` with `overrides` applied; raises KeyError for unknown names"""
+    return with_rules(configured_profiles()[name], overrides)
+
+
+def _yaml():
+    """The yaml module, imported only when there is a YAML profile to read"""
+    try:
+        import yaml
+    except ImportError:  # YAML profiles are optional; JSON always works
+        return None
+    return yaml
+
+
+def load_profiles(directory=PROFILES_DIR):
+    """Load and compile every profile in `directory`, keyed by name"""
+    profiles = {}
+    for filename in sorted(os.listdir(directory)):
+        path = os.path.join(directory, filename)
+        extension = os.path.splitext(filename)[1].lower()
+        if extension not in ('.json', '.yaml', '.yml'):
+            continue
+        yaml = _yaml() if extension != '.json' else None
+        if extension != '.json' and yaml is None:
+            log.warning("Skipping %s, PyYAML is not installed", filename)
+            continue
+        with open(path, encoding='utf-8') as f:
+            try:
+                data = json.load(f) if yaml is None else yaml.safe_load(f)
+            except (ValueError, getattr(yaml, 'YAMLError', ValueError)) as e:
+                raise ProfileError(f"{filename}: {e}") from e
+        profile = compile_profile(data, filename)
+        if profile.name in profiles:
+            raise ProfileError(f"{filename}: duplicate profile name '{profile.name}'")
+        profiles[profile.name] = profile
+    if DEFAULT_PROFILE not in profiles:
+        raise ProfileError(f"No '{DEFAULT_PROFILE}' profile in {directory}")
+    return profiles
+
+
+_configured = None
+
+
+def configured_profiles():
+    """Profiles from RULE_PROFILES_DIR (default: profiles/), loaded once per process"""
+    global _configured
+    if _configured is None:
+        _configured = load_profiles(os.environ.get('RULE_PROFILES_DIR', PROFILES_DIR))
+    return _configured
@@ -0,0 +1,209 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+def content_key(content_hash, fingerprint):
+    """Cache key for a document's SHA-256 under a rules fingerprint"""
+    return hashlib.sha256(f'{content_hash}:{fingerprint}'.encode()).hexdigest()
+
+
+class ResultCache:
+    """Two-tier LRU cache of check results keyed by document content
+
+    The memory tier holds up to ``max_entries`` results; the disk tier stores
+    gzipped JSON under ``directory`` so results survive restarts, bounded by
+    ``max_disk_bytes``. Entries older than ``ttl`` seconds are never served.
+    """
+
+    def __init__(self, directory=None, max_entries=128, max_disk_bytes=256 * 1024 * 1024, ttl=7 * 24 * 3600):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()  # key -> (stored_at, result)
+        self._disk = OrderedDict()  # key -> (stored_at, size), least recently used first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            self._scan_disk()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.json.gz')
+
+    def _scan_disk(self):
+        """Index the disk tier left by previous runs, oldest first"""
+        entries = []
+        try:
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if not name.endswith('.json.gz'):
+                        continue
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_mtime, name[:-len('.json.gz')], stat.st_size))
+        except OSError as e:
+            log.warning("Could not read result cache directory: %s", e)
+            return
+        for stored_at, key, size in sorted(entries):
+            self._disk[key] = (stored_at, size)
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _index_disk(self, key):
+        """Index an entry another process (e.g. another gunicorn worker) wrote since the scan"""
+        try:
+            stat = os.stat(self._path(key))
+        except OSError:
+            return None
+        stored = self._disk[key] = (stat.st_mtime, stat.st_size)
+        self._disk_bytes += stat.st_size
+        return stored
+
+    def _remove_disk(self, key):
+        stored = self._disk.pop(key, None)
+        if stored is None:
+            return
+        self._disk_bytes -= stored[1]
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        expired_before = time.time() - self.ttl
+        while self._disk:
+            key, (stored_at, _) = next(iter(self._disk.items()))
+            if self._disk_bytes <= self.max_disk_bytes and stored_at >= expired_before:
+                break
+            self._remove_disk(key)
+
+    def _remember(self, key, stored_at, result):
+        self._memory[key] = (stored_at, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached result for `key`, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._memory.pop(key, None)
+
+            stored = self._disk.get(key)
+            if stored is None and self.directory:
+                stored = self._index_disk(key)
+            if stored is not None and now - stored[0] < self.ttl:
+                try:
+                    with gzip.open(self._path(key), 'rt', encoding='utf-8') as f:
+                        result = json.load(f)
+                except (OSError, ValueError):
+                    self._remove_disk(key)
+                else:
+                    self._disk.move_to_end(key)
+                    self._remember(key, stored[0], result)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return result
+            elif stored is not None:
+                self._remove_disk(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        """Store a result in memory and, if configured, on disk"""
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, result)
+        if not self.directory:
+            return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                f.write(json.dumps(result).encode('utf-8'))
+            os.replace(temp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            log.warning("Could not write result cache entry: %s", e)
+            return
+        with self._lock:
+            self._remove_disk_index(key)
+            self._disk[key] = (stored_at, size)
+            self._disk_bytes += size
+            self._evict_disk()
+
+    def _remove_disk_index(self, key):
+        stored = self._disk.pop(key, None)
+        if stored is not None:
+            self._disk_bytes -= stored[1]
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            for key in list(self._disk):
+                self._remove_disk(key)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round(100.0 * self.hits / lookups, 1) if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'disk_entries': len(self._disk),
+            'disk_bytes': self._disk_bytes,
+        }
+
+
+class LRUCache:
+    """Small thread-safe in-memory LRU mapping with hit/miss counters"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
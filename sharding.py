@@ -0,0 +1,385 @@
+"""Check very large documents in shards on several worker processes.
+
+A single check is bound to one core, and most of its time goes into turning
+paragraph XML into records. For documents whose main part is large enough,
+that work and the paragraph and run rules are spread over a pool of shard
+workers instead:
+
+- The document XML is decompressed once into a file in ``/dev/shm`` (the temp
+  directory where there is none), which every worker maps read-only.
+- The parent cuts it into ``n`` slices of about equal size, each starting at a
+  body-level paragraph. It finds them by scanning the tags that can hold
+  paragraphs, without parsing.
+- Worker ``k`` parses only slice ``k``, wrapped in the document's start tags,
+  and builds and checks its paragraphs' records. Since the page count where
+  a slice starts is only known once the slices before it are merged, pages
+  are counted from the start of the slice, once for each state the page
+  tracker can carry across a paragraph. The merge picks the right count, so
+  page numbers come out exactly as in a serial pass.
+- The checker walks the merged records in document order. The state that
+  carries across shards evolves as it would serially: chapter and section
+  tracking, the skipped pages, line numbers and issue ranges.
+"""
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import BrokenExecutor
+
+from check_pool import cpu_budget
+from profiles import resolve_profile
+
+try:
+    import resource
+except ImportError:  # Windows has no rlimits
+    resource = None
+
+log = logging.getLogger(__name__)
+
+CHUNK = 1 << 16  # bytes of XML fed to the parser at a time
+MB = 1 << 20
+SHARD_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+W_MAIN = b'http://schemas.openxmlformats.org/wordprocessingml/2006/main'  # docx_stream.W_NS
+ROOT_TAG = re.compile(rb'<([A-Za-z_][\w.-]*(?::[\w.-]+)?)(?=[\s/>])')  # the first start tag, after the prolog
+
+
+def _lift_cpu_limit():
+    """Shard worker initializer: drop the per-check CPU limit inherited from a check worker"""
+    if resource is not None:
+        soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+def check_shard(path, start, end, header, footer, trackers, styles_xml, theme_xml, profile_name, rules, cpu_seconds=None):
+    """Check the body paragraphs in bytes [start, end) of the XML in `path`
+
+    Executed in a shard worker, which parses only its slice: `header` (the XML
+    up to the body start tag) and `footer` (the end tags after it) wrap it into
+    a document of its own. Page boundaries are counted once per PageTracker in
+    `trackers`, one for each state the page count can be in where the slice
+    starts. Returns (entries, pages). Entries hold a (record, findings,
+    has_image_issue) per paragraph, like the paragraph cache, with the
+    record's runs dropped since the rules have already seen them. Pages hold,
+    per tracker, the (page it ends on, page before it) of every paragraph and
+    the tracker after the slice. Returns None when the slice does not start
+    and end between body children.
+    """
+    import mmap
+    from lxml import etree
+    from checker import DocumentChecker
+    from docx_stream import DocxStream, W_P, body_paragraphs
+
+    stream = DocxStream.from_style_parts(styles_xml, theme_xml)
+    checker = DocumentChecker(None, profile=resolve_profile(profile_name, rules))
+    pages = [[] for _ in trackers]
+    parser = etree.XMLPullParser(events=('end',), tag=W_P, huge_tree=True)
+
+    def events(data):
+        parser.feed(header)
+        for offset in range(start, end, CHUNK):
+            parser.feed(data[offset:min(offset + CHUNK, end)])
+            yield from parser.read_events()
+        parser.feed(footer)
+        parser.close()
+        yield from parser.read_events()
+
+    entries = []
+    body = None
+    with cpu_budget(cpu_seconds), open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        try:
+            for index, p in enumerate(body_paragraphs(events(data), _Trackers(trackers))):
+                body = p.getparent()
+                for tracker, tracker_pages in zip(trackers, pages):
+                    before = tracker.page
+                    tracker_pages.append((tracker.paragraph(p), before))
+                record = stream.paragraph_record(p, index)
+                findings, has_image_issue = checker.check_paragraph(record)
+                record.runs = []
+                entries.append((record, findings, has_image_issue))
+        except etree.XMLSyntaxError:
+            return None
+    if body is not None:
+        # Body content after the last paragraph still carries page breaks
+        # into the next slice
+        for child in body:
+            for tracker in trackers:
+                tracker.scan(child)
+    return entries, list(zip(pages, trackers))
+
+
+class _Trackers:
+    """Feeds the body content between paragraphs to several PageTrackers"""
+
+    def __init__(self, trackers):
+        self.trackers = trackers
+
+    def scan(self, elem):
+        for tracker in self.trackers:
+            tracker.scan(elem)
+
+
+def split_body(data, shards):
+    """Split document XML into at most `shards` slices of whole body children
+
+    Returns (header, footer, bounds): the XML up to and including the body
+    start tag, the end tags that close the body and the document, and the
+    byte offsets where the slices start and end. Slices are cut before a
+    body-level paragraph found by scanning the tags that can hold paragraphs,
+    so no parsing is needed; a cut in the wrong place leaves the slice
+    malformed, which its shard worker reports. None when the document does not
+    declare a prefix for the WordprocessingML namespace or has too few
+    paragraphs to split.
+    """
+    root = ROOT_TAG.search(data)
+    if root is None:
+        return None
+    root_end = data.find(b'>', root.end())
+    declared = re.compile(rb'xmlns:([\w.-]+)\s*=\s*["\']' + re.escape(W_MAIN) + rb'["\']').search(data, root.start(), root_end)
+    if declared is None:
+        return None
+    prefix = declared.group(1)
+    body = re.compile(rb'<' + prefix + rb':body(?=[\s/>])').search(data, root_end)
+    if body is None:
+        return None
+    body_end = data.find(b'>', body.end()) + 1
+    if data[body_end - 2:body_end] == b'/>':
+        return None
+    header = data[:body_end]
+    footer = b'</' + prefix + b':body></' + root.group(1) + b'>'
+
+    size = len(data)
+    targets = [size * k // shards for k in range(1, shards)]
+    bounds = [0]
+    depth = 0  # open elements below the body that can hold paragraphs
+    body_paragraphs = 0
+    tags = re.compile(rb'<(/?)' + prefix + rb':(p|tbl|sdt|customXml|txbxContent)(?=[\s/>])')
+    for tag in tags.finditer(data, body_end):
+        if not targets:
+            break
+        if tag.group(1):
+            depth -= 1
+            continue
+        if depth == 0 and tag.group(2) == b'p':
+            body_paragraphs += 1
+            # Every slice but the first starts after a paragraph, as PageTracker.resumed assumes
+            if body_paragraphs > 1 and tag.start() >= targets[0]:
+                bounds.append(tag.start())
+                targets = [target for target in targets if target > tag.start()]
+        if data[data.find(b'>', tag.end()) - 1] != ord('/'):
+            depth += 1
+    if len(bounds) < 2:
+        return None
+    bounds.append(size)
+    return header, footer, bounds
+
+
+class ShardedStream:
+    """The paragraphs of one document, checked on a ShardPool and merged in document order
+
+    Stands in for DocxStream in DocumentChecker.check_document: `outline()`
+    scans the merged records, and `paragraphs()` yields (record, entry) pairs
+    for the rest, where the entry holds the findings the shard worker found
+    for the record.
+    """
+
+    def __init__(self, pool, stream, executor, profile, shards):
+        import mmap
+        from docx_stream import PageTracker
+        self.pool = pool
+        self.stream = stream
+        self.paragraph_pages = []
+        self.futures = []
+        self._merged = 0
+        self._serial = False  # the paragraphs not merged are being checked here instead
+        self._entries = self._merge()
+        fd, self.path = tempfile.mkstemp(prefix='docx-shard-', suffix='.xml', dir=SHARD_DIR)
+        try:
+            with os.fdopen(fd, 'wb') as f, stream.zip.open(stream.document_part) as part:
+                shutil.copyfileobj(part, f, 16 * CHUNK)
+            with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                split = split_body(data, shards)
+            if split is None:
+                raise ValueError("document XML cannot be split at body paragraphs")
+            header, footer, bounds = split
+            size = bounds[-1]
+            styles_xml, theme_xml = stream.style_parts()
+            for start, end in zip(bounds, bounds[1:]):
+                if start == 0:
+                    trackers = [PageTracker()]
+                else:
+                    trackers = [PageTracker.resumed(state) for state in PageTracker.CARRIED_STATES]
+                self.futures.append(executor.submit(
+                    check_shard, self.path, start, end, header if start > 0 else b'', footer if end < size else b'',
+                    trackers, styles_xml, theme_xml, profile.name, dict(profile.overrides), pool.cpu_seconds))
+        except BaseException:
+            self._release()
+            raise
+        log.debug("Checking %d bytes of document XML in %d shards", size, len(self.futures))
+
+    def _merge(self):
+        """Yield (record, entry) for every body paragraph, in document order
+
+        Shard workers count pages from the start of their slice, for every
+        state the page count can be in there; records get their page numbers
+        here, carrying each shard's page count and tracker state into the
+        next. If a shard worker dies, or a slice was not cut between body
+        children, the paragraphs not merged yet are built and checked in this
+        process instead, with no entry.
+        """
+        from docx_stream import PageTracker
+        offset = 0  # pages before the current shard
+        carried = None  # carried_state() of the previous shard's tracker
+        for future in self.futures:
+            try:
+                shard = future.result()
+            except BrokenExecutor as e:
+                self.pool.discard()
+                log.warning("Shard worker died, checking the document from paragraph %d in one pass: %s",
+                            len(self.paragraph_pages) + 1, e)
+                yield from self._check_rest()
+                return
+            if shard is None:
+                log.warning("Document XML was not split between body children, checking it from paragraph %d "
+                            "in one pass", len(self.paragraph_pages) + 1)
+                yield from self._check_rest()
+                return
+            entries, variants = shard
+            if carried is None:
+                pages, tracker = variants[0]
+            else:
+                pages, tracker = variants[PageTracker.CARRIED_STATES.index(carried)]
+            for entry, (page, page_before) in zip(entries, pages):
+                record = entry[0]
+                record.index = len(self.paragraph_pages)
+                record.page = offset + page
+                record.has_page_break = page != page_before
+                self.paragraph_pages.append(record.page)
+                yield record, entry
+            offset += tracker.page
+            carried = tracker.carried_state()
+            self._merged += 1
+
+    def _check_rest(self):
+        """Yield (record, None) for the paragraphs not merged yet"""
+        self._serial = True
+        for record in self.stream.paragraphs(start=len(self.paragraph_pages)):
+            self.paragraph_pages.append(record.page)
+            yield record, None
+
+    def outline(self, is_heading, skip_pages=None):
+        """An Outline of the merged records, as DocxStream.outline scans it"""
+        from docx_stream import scan_outline
+        return scan_outline((record for record, _ in self._entries), is_heading, skip_pages)
+
+    def paragraphs(self):
+        """Yield (record, entry) for the paragraphs `outline()` left unread, or for all of them"""
+        return self._entries
+
+    def progress(self):
+        """Fraction of the shards merged so far, or of the document read once checked in one pass"""
+        if self._serial:
+            return self.stream.progress()
+        return self._merged / len(self.futures) if self.futures else 0.0
+
+    def _release(self):
+        """Cancel the shards not yet started and remove the shared XML"""
+        for future in self.futures:
+            future.cancel()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def close(self):
+        self._release()
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ShardPool:
+    """Worker processes that check the shards of large documents
+
+    Documents whose main part is at least ``min_document_mb`` are split into
+    ``workers`` shards. With ``workers=0``, or where processes cannot be
+    started, every document is checked in a single pass. `cpu_seconds` is the
+    CPU budget of each shard.
+    """
+
+    def __init__(self, workers=0, min_document_mb=4, cpu_seconds=None):
+        self.workers = workers
+        self.min_bytes = int(min_document_mb * MB)
+        self.cpu_seconds = cpu_seconds
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        """Create the process pool on first use; None when sharding is off"""
+        with self._lock:
+            if self._executor is None and self.workers > 0:
+                try:
+                    # Imported here so deployments without sharding never load multiprocessing
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+                    from multiprocessing import util
+                    # The pool is started from a check worker or web process that
+                    # already runs threads; a fork server starts shard workers from
+                    # a clean single-threaded process instead
+                    context = None
+                    if 'forkserver' in multiprocessing.get_all_start_methods():
+                        context = multiprocessing.get_context('forkserver')
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                         initializer=_lift_cpu_limit)
+                    # A check worker exits through multiprocessing's finalizers, which
+                    # close the pool's queues at priority 10; stop the shard workers
+                    # before that, while they can still be sent the stop sentinel
+                    util.Finalize(self._executor, self._executor.shutdown, exitpriority=100)
+                except (OSError, NotImplementedError, ImportError) as e:
+                    log.warning("Shard workers unavailable, checking documents in one pass: %s", e)
+                    self.workers = 0
+            return self._executor
+
+    def discard(self):
+        """Forget a pool whose worker died; the next document starts a fresh one"""
+        with self._lock:
+            self._executor = None
+
+    def open(self, stream, profile):
+        """A ShardedStream over `stream` if its document is large enough to shard, else `stream`
+
+        Shard workers look the profile up by name and apply its overrides, so
+        profiles that are not among the configured ones are always checked in
+        a single pass.
+        """
+        if self.workers <= 0 or stream.document_size() < self.min_bytes:
+            return stream
+        try:
+            configured = resolve_profile(profile.name, profile.overrides)
+        except KeyError:
+            return stream
+        if configured.hash != profile.hash:
+            return stream
+        executor = self._get_executor()
+        if executor is None:
+            return stream
+        try:
+            return ShardedStream(self, stream, executor, profile, self.workers)
+        except BrokenExecutor:
+            self.discard()
+        except OSError as e:
+            log.warning("Could not shard document, checking it in one pass: %s", e)
+        except ValueError as e:
+            log.debug("Checking document in one pass: %s", e)
+        return stream
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
@@ -0,0 +1,76 @@
+"""Precompiled Jinja templates that a cold start loads instead of compiling.
+
+Compiling the templates costs a fresh process more than rendering them, and on
+serverless deployments every cold start pays it on its first request. The
+build step writes each template as a Python module plus a manifest of template
+source hashes:
+
+    python snapshot.py
+
+At startup the app loads templates from the snapshot when the manifest still
+matches the templates on disk and the installed Jinja; otherwise the snapshot
+is ignored and templates compile as usual.
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshot')
+MANIFEST = 'manifest.json'
+
+log = logging.getLogger(__name__)
+
+
+def template_hashes(app):
+    """{template name: sha256 of its source} for the app's template folder"""
+    folder = os.path.join(app.root_path, app.template_folder)
+    hashes = {}
+    for filename in sorted(os.listdir(folder)):
+        path = os.path.join(folder, filename)
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                hashes[filename] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def _manifest(app):
+    import jinja2
+    return {'jinja2': jinja2.__version__, 'templates': template_hashes(app)}
+
+
+def build(app, directory=SNAPSHOT_DIR):
+    """Compile every template of `app` into `directory` and write its manifest"""
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.startswith('tmpl_') and name.endswith('.py'):
+            os.remove(os.path.join(directory, name))
+    # Compile from the template sources even when a snapshot is already installed
+    env = app.jinja_env.overlay(loader=app.create_global_jinja_loader())
+    env.compile_templates(directory, zip=None, ignore_errors=False)
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(_manifest(app), f, indent=2, sort_keys=True)
+    return directory
+
+
+def install(app, directory=SNAPSHOT_DIR):
+    """Serve `app`'s templates from the snapshot in `directory` when it is current"""
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if manifest != _manifest(app):
+        log.warning("Template snapshot in %s is stale; run snapshot.py to rebuild it", directory)
+        return False
+    from jinja2 import ChoiceLoader, ModuleLoader
+    app.jinja_env.loader = ChoiceLoader([ModuleLoader(directory), app.jinja_env.loader])
+    return True
+
+
+if __name__ == '__main__':
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    from app import app
+    target = sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_DIR
+    print(f"Template snapshot written to {build(app, target)}")
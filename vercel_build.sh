@@ -5,6 +5,9 @@ set -e
 pip install --upgrade pip
 pip install -r requirements-vercel.txt
 
+# Precompile the templates so cold starts skip Jinja compilation
+python snapshot.py
+
 # Create a vercel.json file if it doesn't exist
 if [ ! -f vercel.json ]; then
     echo '{